@@ -0,0 +1,41 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from recipes.catalog import user_lists_version
+from rest_framework import status
+
+
+def recipe_validators(request, *parts, updated_at=None):
+    """
+    ETag и Last-Modified ответа с рецептами. Для пользователя в ETag
+    входит версия его избранного, корзины и подписок, а Last-Modified
+    не отдается: флаги в выдаче меняются без изменения рецептов.
+    Без общего кэша версий пользователю не отдается ничего.
+    """
+    user = request.user
+    if user.is_authenticated:
+        version = user_lists_version(user.id)
+        if version is None:
+            return None, None
+        parts += (user.id, version)
+        updated_at = None
+    etag = '"{}"'.format(hashlib.md5(repr(parts).encode()).hexdigest())
+    return etag, updated_at and timegm(updated_at.utctimetuple())
+
+
+def conditional_response(request, validators, respond):
+    """304 по If-None-Match или If-Modified-Since до вызова respond"""
+    etag, last_modified = validators
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        response = respond()
+    if etag and response.status_code in (status.HTTP_200_OK,
+                                         status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
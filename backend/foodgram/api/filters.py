@@ -1,8 +1,9 @@
-from django.db.models import BooleanField, ExpressionWrapper, Q
-from django_filters.rest_framework import (Filter, FilterSet,
+from django_filters.rest_framework import (CharFilter, ChoiceFilter, Filter,
+                                           FilterSet,
                                            ModelMultipleChoiceFilter,
                                            NumberFilter)
-from recipes.models import Recipe, Tag
+from recipes.models import Favorite, Recipe, ShoppingCart, Tag
+from recipes.search import search_recipes
 
 
 class RecipeFilter(FilterSet):
@@ -20,41 +21,54 @@ class RecipeFilter(FilterSet):
         field_name='tags__slug',
         to_field_name='slug'
     )
+    search = CharFilter(
+        method='filter_search'
+    )
+    ordering = ChoiceFilter(
+        choices=(('popular', 'По популярности'),),
+        method='filter_ordering'
+    )
 
     def filter_is_favorited(self, queryset, name, value):
         if value == 1:
-            return queryset.filter(is_favorited=self.request.user)
+            return self.filter_listed(queryset, Favorite)
         return queryset
 
     def filter_is_shopping_cart(self, queryset, name, value):
         if value == 1:
-            return queryset.filter(is_in_shopping_cart=self.request.user)
+            return self.filter_listed(queryset, ShoppingCart)
         return queryset
 
+    def filter_listed(self, queryset, model):
+        """Рецепты из списка пользователя: выборка идет от его списка,
+        а не проверкой каждого рецепта"""
+        user = self.request.user
+        if user.is_anonymous:
+            return queryset.none()
+        return queryset.filter(id__in=model.objects.filter(
+            user=user
+        ).values('recipe_id'))
+
     def filter_author(self, queryset, name, value):
         if value == 'me':
             return queryset.filter(author=self.request.user)
         return queryset.filter(author=value)
 
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        if value == 'popular':
+            return queryset.order_by('-favorites_count', '-pub_date')
+        return queryset
+
     class Meta:
         model = Recipe
         fields = (
             'is_favorited',
             'is_in_shopping_cart',
             'author',
-            'tags'
-        )
-
-
-class IngredientFilter(FilterSet):
-    name = Filter(
-        method='filter_name'
-    )
-
-    def filter_name(self, queryset, name, value):
-        data = queryset.filter(name__contains=value)
-        startswith = ExpressionWrapper(
-            Q(name__startswith=value),
-            output_field=BooleanField()
+            'tags',
+            'search',
+            'ordering'
         )
-        return data.annotate(startswith=startswith).order_by('-startswith')
@@ -0,0 +1,137 @@
+import threading
+import time
+import uuid
+from bisect import bisect_left
+
+from django.conf import settings
+from recipes.catalog import current_version, local_data_ttl, shared_cache
+from recipes.models import Ingredient
+
+from .metrics import record_cache
+
+VERSION_CACHE_KEY = 'ingredient_index_version'
+NGRAM_SIZE = 3
+
+
+def normalize(value):
+    return value.strip().lower()
+
+
+def ngrams(value, size):
+    return {value[i:i + size] for i in range(len(value) - size + 1)}
+
+
+class IngredientIndex:
+    """
+    Индекс ингредиентов в памяти процесса для автодополнения.
+    Совпадения по началу названия ищутся бинарным поиском по
+    отсортированному массиву, по подстроке - пересечением списков
+    n-грамм. Индекс перестраивается, когда меняется версия в общем
+    кэше VERSION_CACHE_ALIAS (её обновляют сигналы Ingredient) или
+    истекает INGREDIENT_INDEX_TTL. Без общего кэша версии нет, и
+    изменения из других процессов видны через UNSHARED_DATA_TTL.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.version = None
+        self.built_at = None
+        self.data = ([], [], {})
+
+    def build(self):
+        rows = sorted(
+            (normalize(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+        postings = {}
+        for position, row in enumerate(rows):
+            key = row[0]
+            for size in range(1, NGRAM_SIZE + 1):
+                for gram in ngrams(key, size):
+                    postings.setdefault(gram, []).append(position)
+        self.data = (
+            [row[0] for row in rows],
+            [
+                {'id': pk, 'name': name, 'measurement_unit': measurement_unit}
+                for _, pk, name, measurement_unit in rows
+            ],
+            postings
+        )
+
+    def is_stale(self, version, shared):
+        return (
+            self.built_at is None
+            or version != self.version
+            or time.monotonic() - self.built_at > local_data_ttl(
+                settings.INGREDIENT_INDEX_TTL, shared
+            )
+        )
+
+    def refresh(self):
+        shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+        version = (
+            current_version(shared, VERSION_CACHE_KEY)
+            if shared is not None else None
+        )
+        if not self.is_stale(version, shared):
+            record_cache('ingredient_index', hit=True)
+            return
+        record_cache('ingredient_index', hit=False)
+        with self.lock:
+            if self.is_stale(version, shared):
+                self.build()
+                self.version = version
+                self.built_at = time.monotonic()
+
+    def search(self, query):
+        """Ингредиенты, содержащие query: сначала начинающиеся с него"""
+        query = normalize(query)
+        if not query:
+            return []
+        self.refresh()
+        keys, items, postings = self.data
+        prefix = []
+        position = bisect_left(keys, query)
+        while position < len(keys) and keys[position].startswith(query):
+            prefix.append(position)
+            position += 1
+        found = set(prefix)
+        rest = [
+            position for position in substring_positions(
+                keys, postings, query
+            )
+            if position not in found
+        ]
+        return [items[position] for position in prefix + rest]
+
+
+def substring_positions(keys, postings, query):
+    grams = sorted(
+        (
+            postings.get(gram, ())
+            for gram in ngrams(query, min(len(query), NGRAM_SIZE))
+        ),
+        key=len
+    )
+    candidates = set(grams[0])
+    for positions in grams[1:]:
+        candidates.intersection_update(positions)
+    return sorted(
+        position for position in candidates if query in keys[position]
+    )
+
+
+def invalidate():
+    """
+    Помечает индексы ингредиентов во всех процессах устаревшими.
+    Без общего кэша сразу перестраивается только индекс этого процесса.
+    """
+    ingredient_index.built_at = None
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is not None:
+        shared.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+ingredient_index = IngredientIndex()
@@ -0,0 +1,381 @@
+import json
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+BASELINE_PATH = os.path.join(
+    settings.BASE_DIR, 'api', 'benchmark_baseline.json'
+)
+IMAGE = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+Case = namedtuple('Case', 'name method url data save_as headers')
+Case.__new__.__defaults__ = (None, None, None)
+
+
+def recipe_data(context):
+    return {
+        'name': 'Бенчмарк',
+        'text': 'Рецепт для замера производительности',
+        'cooking_time': 10,
+        'image': IMAGE,
+        'tags': [context['tag_id']],
+        'ingredients': [
+            {'id': ingredient_id, 'amount': 10}
+            for ingredient_id in context['ingredient_ids']
+        ],
+    }
+
+
+def recipes_list_data(context):
+    return {'recipes': context['free_recipe_ids']}
+
+
+def if_none_match(context, url):
+    """ETag последнего ответа по этому адресу"""
+    return {'HTTP_IF_NONE_MATCH': context['etags'].get(url, '')}
+
+
+CASES = (
+    Case('recipes-list', 'get', '/api/recipes/'),
+    Case('recipes-list-limit-50', 'get', '/api/recipes/?limit=50'),
+    Case('recipes-list-page-10', 'get', '/api/recipes/?page=10'),
+    Case('recipes-list-cursor', 'get', '/api/recipes/?cursor=&limit=50'),
+    Case('recipes-list-favorited', 'get', '/api/recipes/?is_favorited=1'),
+    Case(
+        'recipes-list-in-cart', 'get', '/api/recipes/?is_in_shopping_cart=1'
+    ),
+    Case('recipes-list-author', 'get', '/api/recipes/?author={author_id}'),
+    Case('recipes-list-author-me', 'get', '/api/recipes/?author=me'),
+    Case('recipes-list-tags', 'get', '/api/recipes/?tags={tag_slug}'),
+    Case('recipes-list-search', 'get', '/api/recipes/?search={search}'),
+    Case('recipes-list-popular', 'get', '/api/recipes/?ordering=popular'),
+    Case(
+        'recipes-list-sparse', 'get',
+        '/api/recipes/?is_favorited=1&fields=id,name,image,cooking_time'
+    ),
+    Case(
+        'recipes-list-not-modified', 'get', '/api/recipes/?ordering=popular',
+        headers=if_none_match
+    ),
+    Case('recipes-detail', 'get', '/api/recipes/{recipe_id}/'),
+    Case(
+        'recipes-detail-sparse', 'get',
+        '/api/recipes/{recipe_id}/?omit=ingredients,text,tags'
+    ),
+    Case(
+        'recipes-detail-not-modified', 'get', '/api/recipes/{recipe_id}/',
+        headers=if_none_match
+    ),
+    Case('recipes-feed', 'get', '/api/recipes/feed/'),
+    Case('recipes-similar', 'get', '/api/recipes/{recipe_id}/similar/'),
+    Case('recipes-pantry', 'get', '/api/recipes/pantry/?{pantry}'),
+    Case(
+        'recipes-pantry-filtered', 'get',
+        '/api/recipes/pantry/?{pantry}&tags={tag_slug}&cooking_time=30'
+    ),
+    Case('recipes-create', 'post', '/api/recipes/', recipe_data, 'new_id'),
+    Case('recipes-update', 'patch', '/api/recipes/{new_id}/', recipe_data),
+    Case('recipes-delete', 'delete', '/api/recipes/{new_id}/'),
+    Case('favorite-add', 'post', '/api/recipes/{free_recipe_id}/favorite/'),
+    Case(
+        'favorite-remove', 'delete', '/api/recipes/{free_recipe_id}/favorite/'
+    ),
+    Case(
+        'shopping-cart-add', 'post',
+        '/api/recipes/{free_recipe_id}/shopping_cart/'
+    ),
+    Case(
+        'shopping-cart-remove', 'delete',
+        '/api/recipes/{free_recipe_id}/shopping_cart/'
+    ),
+    Case(
+        'favorite-bulk-add', 'post', '/api/recipes/favorite/',
+        recipes_list_data
+    ),
+    Case(
+        'favorite-bulk-remove', 'delete', '/api/recipes/favorite/',
+        recipes_list_data
+    ),
+    Case(
+        'shopping-cart-bulk-add', 'post', '/api/recipes/shopping_cart/',
+        recipes_list_data
+    ),
+    Case(
+        'shopping-cart-bulk-remove', 'delete', '/api/recipes/shopping_cart/',
+        recipes_list_data
+    ),
+    Case(
+        'download-shopping-cart', 'get',
+        '/api/recipes/download_shopping_cart/'
+    ),
+    Case(
+        'download-shopping-cart-csv', 'get',
+        '/api/recipes/download_shopping_cart/?type=csv'
+    ),
+    Case('ingredients-list', 'get', '/api/ingredients/'),
+    Case('ingredients-search', 'get', '/api/ingredients/?name={prefix}'),
+    Case('ingredients-detail', 'get', '/api/ingredients/{ingredient_id}/'),
+    Case('tags-list', 'get', '/api/tags/'),
+    Case('tags-detail', 'get', '/api/tags/{tag_id}/'),
+    Case('users-list', 'get', '/api/users/'),
+    Case('users-detail', 'get', '/api/users/{author_id}/'),
+    Case('users-me', 'get', '/api/users/me/'),
+    Case(
+        'users-subscriptions', 'get',
+        '/api/users/subscriptions/?recipes_limit=3'
+    ),
+    Case(
+        'users-subscriptions-sparse', 'get',
+        '/api/users/subscriptions/?fields=id,username'
+    ),
+    Case('users-subscribe', 'post', '/api/users/{free_author_id}/subscribe/'),
+    Case(
+        'users-unsubscribe', 'delete', '/api/users/{free_author_id}/subscribe/'
+    ),
+    Case(
+        'users-set-password', 'post', '/api/users/set_password/',
+        lambda context: {
+            'current_password': context['password'],
+            'new_password': context['password'],
+        }
+    ),
+    Case(
+        'token-login', 'post', '/api/auth/token/login/',
+        lambda context: {
+            'email': context['email'], 'password': context['password']
+        }
+    ),
+    Case('token-logout', 'post', '/api/auth/token/logout/'),
+)
+
+
+class Command(BaseCommand):
+    """
+    Замеряем все эндпоинты API на текущей базе (см. generate_data):
+    p50/p95 времени ответа, число SQL-запросов и пиковую память.
+    Сравниваем с api/benchmark_baseline.json число запросов и память
+    и падаем при превышении. Время зависит от машины, поэтому p95
+    проверяется только с --check-latency на той же машине, где
+    записаны базовые значения. Кэш ответов со списками выключен, чтобы замерять
+    запросы к базе, а не попадания в кэш. Все изменения в базе
+    откатываются, картинки пишутся во временный MEDIA_ROOT.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Допустимый рост пиковой памяти и p95 относительно базовых'
+        )
+        parser.add_argument(
+            '--check-latency', action='store_true',
+            help='Проверять и p95 времени ответа'
+        )
+        parser.add_argument(
+            '--update-baseline', action='store_true',
+            help='Записать результаты как новые базовые значения'
+        )
+        parser.add_argument(
+            '--only', nargs='*', default=None,
+            help='Имена эндпоинтов для замера'
+        )
+
+    def handle(self, *args, **options):
+        cases = [
+            case for case in CASES
+            if not options['only'] or case.name in options['only']
+        ]
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            ALLOWED_HOSTS=['*'], MEDIA_ROOT=media_root,
+            RECIPE_LIST_CACHE_ALIAS=None
+        ), transaction.atomic():
+            context = self.build_context()
+            results = self.measure(cases, context, options['repeat'])
+            transaction.set_rollback(True)
+        self.print_results(results)
+        if options['update_baseline']:
+            self.write_baseline(results)
+            return
+        failures = self.compare(
+            results, options['tolerance'], options['check_latency']
+        )
+        if failures:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(failures)
+            )
+        print('Все эндпоинты в пределах бюджета.')
+
+    def build_context(self):
+        user = User.objects.annotate(
+            follows=Count('user')
+        ).order_by('-follows').first()
+        if user is None or not Recipe.objects.exists():
+            raise CommandError('База пуста, запустите generate_data')
+        password = 'benchmark-password'
+        user.set_password(password)
+        user.save()
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        tag = Tag.objects.first()
+        ingredient = Ingredient.objects.first()
+        free_recipe_ids = list(Recipe.objects.exclude(
+            favorites__user=user
+        ).exclude(shopping_cart__user=user).values_list(
+            'id', flat=True
+        )[:10])
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        return {
+            'user': user,
+            'email': user.email,
+            'password': password,
+            'recipe_id': recipe.id,
+            'author_id': recipe.author_id,
+            'search': recipe.name.split()[0],
+            'free_recipe_id': free_recipe_ids[0],
+            'free_recipe_ids': free_recipe_ids,
+            'free_author_id': User.objects.exclude(
+                following__user=user
+            ).exclude(id=user.id).values_list('id', flat=True).first(),
+            'tag_id': tag.id,
+            'tag_slug': tag.slug,
+            'ingredient_id': ingredient.id,
+            'ingredient_ids': list(
+                Ingredient.objects.values_list('id', flat=True)[:10]
+            ),
+            'prefix': ingredient.name[:3],
+            'etags': {},
+            'pantry': '&'.join(
+                f'ingredients={pk}'
+                for pk in recipe.ingredients.values_list('id', flat=True)
+            ),
+        }
+
+    def request(self, case, context):
+        url = case.url.format(**context)
+        data = case.data(context) if case.data else None
+        headers = case.headers(context, url) if case.headers else {}
+        if case.name == 'token-login':
+            self.client.force_authenticate(None)
+        response = getattr(self.client, case.method)(
+            url, data, format='json', **headers
+        )
+        if response.has_header('ETag'):
+            context['etags'][url] = response['ETag']
+        if response.streaming:
+            b''.join(response.streaming_content)
+        if case.name == 'token-login':
+            self.client.credentials(
+                HTTP_AUTHORIZATION=f'Token {response.data["auth_token"]}'
+            )
+        if case.name == 'token-logout':
+            self.client.credentials()
+            self.client.force_authenticate(context['user'])
+        if response.status_code >= 400:
+            raise CommandError(
+                f'{case.name}: {response.status_code} '
+                f'{getattr(response, "data", "")}'
+            )
+        if case.save_as:
+            context[case.save_as] = response.data['id']
+
+    def measure(self, cases, context, repeat):
+        timings = {case.name: [] for case in cases}
+        queries = {case.name: 0 for case in cases}
+        for case in cases:
+            self.request(case, context)
+        for _ in range(repeat):
+            for case in cases:
+                with CaptureQueriesContext(connection) as captured:
+                    started = time.perf_counter()
+                    self.request(case, context)
+                    elapsed = time.perf_counter() - started
+                timings[case.name].append(elapsed * 1000)
+                queries[case.name] = max(queries[case.name], len(captured))
+        peaks = {}
+        for case in cases:
+            tracemalloc.start()
+            self.request(case, context)
+            peaks[case.name] = tracemalloc.get_traced_memory()[1] // 1024
+            tracemalloc.stop()
+        return {
+            case.name: {
+                'p50_ms': round(statistics.median(timings[case.name]), 2),
+                'p95_ms': round(percentile(timings[case.name], 95), 2),
+                'queries': queries[case.name],
+                'peak_kb': peaks[case.name],
+            }
+            for case in cases
+        }
+
+    def print_results(self, results):
+        print(f'{"эндпоинт":32} {"p50 мс":>8} {"p95 мс":>8} '
+              f'{"запросы":>8} {"пик КБ":>8}')
+        for name, result in results.items():
+            print(
+                f'{name:32} {result["p50_ms"]:8.2f} {result["p95_ms"]:8.2f} '
+                f'{result["queries"]:8} {result["peak_kb"]:8}'
+            )
+
+    def write_baseline(self, results):
+        baseline = read_baseline()
+        baseline.update(results)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Базовые значения записаны в {BASELINE_PATH}')
+
+    def compare(self, results, tolerance, check_latency=False):
+        baseline = read_baseline()
+        failures = []
+        for name, result in results.items():
+            budget = baseline.get(name)
+            if budget is None:
+                failures.append(f'{name}: нет базовых значений')
+                continue
+            if result['queries'] > budget['queries']:
+                failures.append(
+                    f'{name}: запросов {result["queries"]}, '
+                    f'бюджет {budget["queries"]}'
+                )
+            if result['peak_kb'] > budget['peak_kb'] * tolerance:
+                failures.append(
+                    f'{name}: peak_kb {result["peak_kb"]}, '
+                    f'бюджет {budget["peak_kb"]} x {tolerance}'
+                )
+            if check_latency and result['p95_ms'] > (
+                budget['p95_ms'] * tolerance
+            ):
+                failures.append(
+                    f'{name}: p95 {result["p95_ms"]} мс, '
+                    f'бюджет {budget["p95_ms"]} x {tolerance}'
+                )
+        return failures
+
+
+def read_baseline():
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def percentile(values, percent):
+    values = sorted(values)
+    index = max(0, round(percent / 100 * len(values)) - 1)
+    return values[index]
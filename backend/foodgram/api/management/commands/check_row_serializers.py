@@ -0,0 +1,131 @@
+import time
+from functools import partial
+
+from api.row_serializers import (INGREDIENT, TAG, USER, recipe_rows,
+                                 recipes_data)
+from api.serializers import (IngredientSerializer, ReadRecipeSerializer,
+                             TagSerializer)
+from api.sparse_fields import requested_fields
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test import RequestFactory, override_settings
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.request import Request
+from users.models import User
+from users.serializers import UserSerializer
+
+
+class Command(BaseCommand):
+    """
+    Замеряем row_serializers и сериализаторы DRF на текущей базе:
+    страницы рецептов (для анонима и для пользователя с подписками),
+    пользователей, ингредиентов и тегов. Печатаем время обоих
+    вариантов и ускорение. Совпадение JSON проверяют тесты
+    api/tests/test_row_serializers.py.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=5)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def handle(self, *args, **options):
+        user = User.objects.annotate(
+            follows=Count('user')
+        ).order_by('-follows').first()
+        if user is None:
+            raise CommandError('База пуста, запустите generate_data')
+        request = Request(RequestFactory().get('/api/recipes/'))
+        size = options['page_size']
+        pages = [
+            (number * size, number * size + size)
+            for number in range(options['pages'])
+        ]
+        cases = []
+        for reader in (None, user):
+            recipes = Recipe.objects.for_read(reader)
+            for start, stop in pages:
+                cases.append((
+                    f'рецепты {start}-{stop}'
+                    f'{" для пользователя" if reader else ""}',
+                    partial(
+                        serialized, ReadRecipeSerializer,
+                        recipes[start:stop], request
+                    ),
+                    partial(
+                        rows_recipes, recipe_rows(recipes)[start:stop],
+                        request
+                    )
+                ))
+        sparse_request = Request(RequestFactory().get(
+            '/api/recipes/', {'omit': 'ingredients,text'}
+        ))
+        fields = requested_fields(
+            sparse_request, ReadRecipeSerializer.Meta.fields
+        )
+        sparse = Recipe.objects.for_read(user, fields)[:size]
+        cases.append((
+            'рецепты без ингредиентов и описания',
+            partial(serialized, ReadRecipeSerializer, sparse, sparse_request),
+            partial(
+                rows_recipes, recipe_rows(sparse, fields), sparse_request,
+                fields
+            )
+        ))
+        favorites = Recipe.objects.for_read(user).filter(favorites__user=user)
+        cases.append((
+            'избранное пользователя',
+            partial(serialized, ReadRecipeSerializer, favorites, request),
+            partial(rows_recipes, recipe_rows(favorites), request)
+        ))
+        for start, stop in pages:
+            cases.append((
+                f'пользователи {start}-{stop}',
+                partial(serialized, UserSerializer, User.objects.all()[
+                    start:stop
+                ]),
+                partial(USER.many, User.objects.all()[start:stop])
+            ))
+        cases.append((
+            'ингредиенты',
+            partial(serialized, IngredientSerializer, Ingredient.objects),
+            partial(INGREDIENT.many, Ingredient.objects)
+        ))
+        cases.append((
+            'теги',
+            partial(serialized, TagSerializer, Tag.objects),
+            partial(TAG.many, Tag.objects)
+        ))
+        with override_settings(ALLOWED_HOSTS=['*']):
+            self.check_cases(cases, options['repeat'])
+
+    def check_cases(self, cases, repeat):
+        print(f'{"выборка":36} {"DRF мс":>8} {"строки мс":>10} '
+              f'{"ускорение":>10}')
+        for name, expected, actual in cases:
+            serializer_ms = measure(expected, repeat)
+            rows_ms = measure(actual, repeat)
+            print(
+                f'{name:36} {serializer_ms:8.2f} {rows_ms:10.2f} '
+                f'{serializer_ms / rows_ms:9.1f}x'
+            )
+
+
+def serialized(serializer_class, queryset, request=None):
+    return serializer_class(
+        queryset.all(), many=True, context={'request': request}
+    ).data
+
+
+def rows_recipes(rows, request, fields=None):
+    return recipes_data(list(rows.all()), request, fields)
+
+
+def measure(build, repeat):
+    """Лучшее время построения данных в миллисекундах"""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        build()
+        timings.append(time.perf_counter() - started)
+    return min(timings) * 1000
@@ -0,0 +1,60 @@
+import os
+
+from prometheus_client import (CONTENT_TYPE_LATEST, REGISTRY,
+                               CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess)
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+
+requests_total = Counter(
+    'foodgram_requests_total',
+    'Запросы к API по действию вьюсета',
+    ['view', 'method', 'status']
+)
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время ответа API',
+    ['view'],
+    buckets=LATENCY_BUCKETS
+)
+request_queries = Histogram(
+    'foodgram_request_db_queries',
+    'Число SQL-запросов на один запрос к API',
+    ['view'],
+    buckets=QUERY_BUCKETS
+)
+cache_requests = Counter(
+    'foodgram_cache_requests_total',
+    'Обращения к кэшам',
+    ['cache', 'result']
+)
+
+
+def record_cache(name, hit):
+    cache_requests.labels(name, 'hit' if hit else 'miss').inc()
+
+
+def view_label(view_func, method):
+    """RecipeViewSet.list, UserViewSet.subscriptions, TokenCreateView..."""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return view_func.__name__
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(method.lower())
+    if action is None:
+        return view_class.__name__
+    return f'{view_class.__name__}.{action}'
+
+
+def export():
+    """Метрики в текстовом формате Prometheus.
+    Под gunicorn собираются из файлов всех воркеров"""
+    if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
@@ -1,6 +1,160 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict
+
+from django.core.paginator import Paginator
+from django.utils.dateparse import parse_datetime
+from recipes.feed import after, feed_page
+from recipes.models import FeedEntry, Recipe
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from users.models import Follow
+
+
+class KnownCountPaginator(Paginator):
+    """Paginator, которому число объектов может быть уже известно"""
+
+    def __init__(self, *args, count=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if count is not None:
+            self.count = count
 
 
 class PageLimitPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
+
+
+class KeysetPagination:
+    """
+    Пагинация по ключу (pub_date, id) по убыванию. Курсор - позиция
+    последнего рецепта предыдущей страницы в urlsafe base64.
+    """
+    page_size = 6
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(size, self.max_page_size) if size > 0 else self.page_size
+
+    def decode_cursor(self, request):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None
+        try:
+            pub_date, pk = urlsafe_b64decode(
+                cursor.encode()
+            ).decode().split(' ')
+            position = (parse_datetime(pub_date), int(pk))
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if position[0] is None:
+            raise NotFound(self.invalid_cursor_message)
+        return position
+
+    def encode_cursor(self, position):
+        pub_date, pk = position
+        return urlsafe_b64encode(
+            f'{pub_date.isoformat()} {pk}'.encode()
+        ).decode()
+
+    def get_next_link(self):
+        if self.next_position is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_position)
+        )
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', None),
+            ('results', data),
+        ]))
+
+
+class RecipeCursorPagination(KeysetPagination):
+    """
+    Страница рецептов после позиции курсора: условие
+    pub_date < p OR (pub_date = p AND id < i) идет по индексу
+    recipe_pub_date_id_idx без COUNT(*) и OFFSET. Курсор хранит только
+    позицию по дате, поэтому с другой сортировкой (ordering, порядок
+    релевантности search) не сочетается.
+    """
+    ordering_params = ('ordering', 'search')
+    ordering_message = 'Параметр cursor нельзя сочетать с ordering и search'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if any(request.query_params.get(name)
+               for name in self.ordering_params):
+            raise ValidationError(
+                {self.cursor_query_param: self.ordering_message}
+            )
+        self.request = request
+        size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+        if position is not None:
+            queryset = queryset.filter(after(position, 'pub_date', 'id'))
+        recipes = list(queryset.order_by('-pub_date', '-id')[:size + 1])
+        self.next_position = (
+            (recipes[size - 1].pub_date, recipes[size - 1].id)
+            if len(recipes) > size else None
+        )
+        return recipes[:size]
+
+
+class RecipePagination(PageLimitPagination):
+    """
+    Постраничная пагинация, а при наличии параметра cursor
+    (пустого для первой страницы) - пагинация по ключу.
+    """
+    cursor_pagination_class = RecipeCursorPagination
+
+    def __init__(self):
+        self.cursor_paginator = None
+        self.known_count = None
+
+    def django_paginator_class(self, *args, **kwargs):
+        return KnownCountPaginator(*args, count=self.known_count, **kwargs)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.known_count = getattr(view, 'known_count', None)
+        cursor_paginator = self.cursor_pagination_class()
+        if cursor_paginator.cursor_query_param in request.query_params:
+            self.cursor_paginator = cursor_paginator
+            return cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class FeedPagination(KeysetPagination):
+    """
+    Пагинация ленты подписок по ключу (pub_date, id).
+    Курсор - позиция последнего рецепта предыдущей страницы.
+    """
+
+    def paginate_queryset(self, queryset, request):
+        self.request = request
+        size = self.get_page_size(request)
+        keys = feed_page(
+            FeedEntry, Follow, Recipe,
+            request.user, self.decode_cursor(request), size
+        )
+        self.next_position = keys[size - 1] if len(keys) > size else None
+        recipes = queryset.in_bulk([pk for _, pk in keys[:size]])
+        return [recipes[pk] for _, pk in keys[:size] if pk in recipes]
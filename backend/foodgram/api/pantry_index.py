@@ -0,0 +1,155 @@
+import numpy as np
+from recipes.models import Recipe
+
+from .recipe_index import RecipeIndex, load_features
+
+EMPTY_ROWS = np.empty(0, dtype=np.int32)
+
+
+def load_recipes(recipe_ids=None):
+    """id, время приготовления и дата публикации рецептов по возрастанию id"""
+    recipes = Recipe.objects.order_by('id')
+    if recipe_ids is not None:
+        recipes = recipes.filter(id__in=recipe_ids)
+    rows = list(recipes.values_list('id', 'cooking_time', 'pub_date'))
+    return (
+        np.array([pk for pk, _, _ in rows], dtype=np.int64),
+        np.array([minutes for _, minutes, _ in rows], dtype=np.int32),
+        np.array([date.timestamp() for _, _, date in rows], dtype=np.float64)
+    )
+
+
+def group_rows(rows, features):
+    """Списки строк рецептов по признакам: {признак: строки по возрастанию}"""
+    order = np.lexsort((rows, features))
+    features, rows = features[order], rows[order].astype(np.int32)
+    keys, starts = np.unique(features, return_index=True)
+    return dict(zip(keys.tolist(), np.split(rows, starts[1:])))
+
+
+class PantryIndex(RecipeIndex):
+    """
+    Обратный индекс ингредиент -> строки рецептов для поиска по
+    имеющимся продуктам. Множества рецептов хранятся отсортированными
+    массивами строк: ингредиент встречается в доле процента рецептов,
+    и плотная битовая карта на каждый заняла бы в десятки раз больше.
+    Число имеющихся ингредиентов каждого рецепта считается одним
+    np.bincount по спискам выбранных ингредиентов. Строки измененных
+    рецептов помечаются удаленными, а новые версии дописываются в конец.
+    """
+    name = 'pantry_index'
+    ttl_setting = 'PANTRY_INDEX_TTL'
+    max_changes_setting = 'PANTRY_INDEX_MAX_CHANGES'
+
+    def build(self):
+        recipe_ids, cooking_times, pub_dates = load_recipes()
+        recipes, features = load_features()
+        known = np.isin(recipes, recipe_ids)
+        self.data = (
+            recipe_ids,
+            np.ones(len(recipe_ids), dtype=bool),
+            cooking_times,
+            pub_dates,
+            *self.group(recipe_ids, recipes[known], features[known]),
+            {int(pk): row for row, pk in enumerate(recipe_ids)}
+        )
+
+    @staticmethod
+    def group(recipe_ids, recipes, features):
+        """Число ингредиентов рецептов и списки строк по ингредиентам и
+        тегам; recipe_ids отсортированы, recipes - их подмножество"""
+        rows = np.searchsorted(recipe_ids, recipes)
+        is_ingredient = features > 0
+        totals = np.bincount(
+            rows[is_ingredient], minlength=len(recipe_ids)
+        ).astype(np.int32)
+        return (
+            totals,
+            group_rows(rows[is_ingredient], features[is_ingredient]),
+            group_rows(rows[~is_ingredient], -features[~is_ingredient])
+        )
+
+    def apply_changes(self, changed):
+        """Помечает строки измененных рецептов удаленными и дописывает
+        новые версии в конец"""
+        (recipe_ids, alive, cooking_times, pub_dates, totals,
+         ingredients, tags, rows) = self.data
+        alive = alive.copy()
+        rows = dict(rows)
+        for pk in changed:
+            row = rows.pop(pk, None)
+            if row is not None:
+                alive[row] = False
+        added_ids, added_times, added_dates = load_recipes(changed)
+        if len(added_ids):
+            recipes, features = load_features(added_ids.tolist())
+            added_totals, added_ingredients, added_tags = self.group(
+                added_ids, recipes, features
+            )
+            offset = len(recipe_ids)
+            for row, pk in enumerate(added_ids.tolist(), offset):
+                rows[pk] = row
+            ingredients = extend(ingredients, added_ingredients, offset)
+            tags = extend(tags, added_tags, offset)
+            recipe_ids = np.concatenate([recipe_ids, added_ids])
+            alive = np.concatenate([alive, np.ones(len(added_ids), bool)])
+            cooking_times = np.concatenate([cooking_times, added_times])
+            pub_dates = np.concatenate([pub_dates, added_dates])
+            totals = np.concatenate([totals, added_totals])
+        self.data = (
+            recipe_ids, alive, cooking_times, pub_dates, totals,
+            ingredients, tags, rows
+        )
+
+    def is_empty(self):
+        return not len(self.data[0])
+
+    def search(self, ingredient_ids, tag_ids=None, cooking_time=None,
+               max_missing=None):
+        """
+        Массив пар (id рецепта, число недостающих ингредиентов) для
+        рецептов хотя бы с одним из ingredient_ids: сначала те, для
+        которых есть все ингредиенты, затем без одного и так далее,
+        при равенстве - новые раньше.
+        """
+        self.refresh()
+        (recipe_ids, alive, cooking_times, pub_dates, totals,
+         ingredients, tags, _) = self.data
+        postings = [
+            ingredients[pk] for pk in set(ingredient_ids) if pk in ingredients
+        ]
+        if not postings:
+            return np.empty((0, 2), dtype=np.int64)
+        have = np.bincount(
+            np.concatenate(postings), minlength=len(recipe_ids)
+        )
+        missing = totals - have
+        mask = alive & (have > 0)
+        if tag_ids is not None:
+            tagged = np.zeros(len(recipe_ids), dtype=bool)
+            for pk in tag_ids:
+                tagged[tags.get(pk, EMPTY_ROWS)] = True
+            mask &= tagged
+        if cooking_time is not None:
+            mask &= cooking_times <= cooking_time
+        if max_missing is not None:
+            mask &= missing <= max_missing
+        found = np.flatnonzero(mask)
+        found = found[np.lexsort((
+            -recipe_ids[found], -pub_dates[found], missing[found]
+        ))]
+        return np.column_stack((recipe_ids[found], missing[found]))
+
+
+def extend(postings, added, offset):
+    """Копия postings с дописанными строками added, сдвинутыми на offset"""
+    postings = dict(postings)
+    for key, rows in added.items():
+        rows = rows + offset
+        postings[key] = (
+            np.concatenate([postings[key], rows]) if key in postings else rows
+        )
+    return postings
+
+
+pantry_index = PantryIndex()
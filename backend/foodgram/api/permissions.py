@@ -1,3 +1,5 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework import permissions
 
 
@@ -15,3 +17,18 @@ class IsAuthenticatedAuthorOrReadOnly(permissions.BasePermission):
             or obj.author == request.user
             and request.user.is_authenticated
         )
+
+
+class IsAdminOrMetricsToken(permissions.IsAdminUser):
+    """
+    Администратор или сборщик метрик с заголовком
+    Authorization: Bearer <METRICS_TOKEN>
+    """
+
+    def has_permission(self, request, view):
+        token = settings.METRICS_TOKEN
+        if token and constant_time_compare(
+            request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+        ):
+            return True
+        return super().has_permission(request, view)
@@ -0,0 +1,132 @@
+import threading
+import time
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from recipes.catalog import local_data_ttl, shared_cache
+from recipes.models import Recipe, RecipeIngredient
+
+from .metrics import record_cache
+
+SEQUENCE_CACHE_KEY = 'recipe_index_sequence'
+CHANGE_CACHE_KEY = 'recipe_index_change:{}'
+
+
+def load_features(recipe_ids=None):
+    """
+    Пары (рецепт, признак) массивами numpy. Признак - id ингредиента
+    или -id тега, чтобы ингредиенты и теги не пересекались.
+    """
+    ingredients = RecipeIngredient.objects.all()
+    tags = Recipe.tags.through.objects.all()
+    if recipe_ids is not None:
+        ingredients = ingredients.filter(recipe_id__in=recipe_ids)
+        tags = tags.filter(recipe_id__in=recipe_ids)
+    pairs = [
+        np.array(
+            list(queryset.values_list('recipe_id', field).iterator()),
+            dtype=np.int64
+        ).reshape(-1, 2)
+        for queryset, field in ((ingredients, 'ingredient_id'),
+                                (tags, 'tag_id'))
+    ]
+    pairs[1][:, 1] *= -1
+    pairs = np.concatenate(pairs)
+    return pairs[:, 0], pairs[:, 1]
+
+
+class RecipeIndex:
+    """
+    Индекс рецептов в памяти процесса. Строится целиком раз в ttl
+    секунд, а между перестроениями в него дописываются только
+    измененные рецепты из журнала изменений в общем кэше
+    VERSION_CACHE_ALIAS. Без общего кэша журнала нет, и индекс
+    перестраивается раз в UNSHARED_DATA_TTL секунд.
+    """
+    name = None
+    ttl_setting = None
+    max_changes_setting = None
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sequence = None
+        self.built_at = None
+        self.data = None
+
+    def build(self):
+        raise NotImplementedError
+
+    def apply_changes(self, changed):
+        raise NotImplementedError
+
+    def is_empty(self):
+        return False
+
+    def is_expired(self, shared):
+        return (
+            self.built_at is None
+            or time.monotonic() - self.built_at
+            > local_data_ttl(getattr(settings, self.ttl_setting), shared)
+        )
+
+    def refresh(self):
+        shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+        sequence = (
+            shared.get(SEQUENCE_CACHE_KEY, 0) if shared is not None else None
+        )
+        if not self.is_expired(shared) and sequence == self.sequence:
+            record_cache(self.name, hit=True)
+            return
+        record_cache(self.name, hit=False)
+        with self.lock:
+            if self.is_expired(shared) or not self.load_changes(
+                shared, sequence
+            ):
+                self.build()
+                self.built_at = time.monotonic()
+            self.sequence = sequence
+
+    def load_changes(self, shared, sequence):
+        """Применяет журнал изменений; False, если нужно перестроение"""
+        if shared is None or self.sequence is None:
+            return False
+        if sequence < self.sequence:
+            return False
+        if self.is_empty():
+            return False
+        if sequence - self.sequence > getattr(
+            settings, self.max_changes_setting
+        ):
+            return False
+        keys = [
+            CHANGE_CACHE_KEY.format(number)
+            for number in range(self.sequence + 1, sequence + 1)
+        ]
+        if not keys:
+            return True
+        changes = shared.get_many(keys)
+        if len(changes) < len(keys):
+            return False
+        self.apply_changes(set(changes.values()))
+        return True
+
+
+def record_change(recipe_id):
+    """
+    Записывает изменение рецепта в журнал после коммита транзакции.
+    Без общего кэша журнал не ведется: его не увидят другие процессы.
+    """
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is None:
+        return
+
+    def write():
+        shared.add(SEQUENCE_CACHE_KEY, 0, None)
+        sequence = shared.incr(SEQUENCE_CACHE_KEY)
+        shared.set(
+            CHANGE_CACHE_KEY.format(sequence),
+            recipe_id,
+            settings.RECIPE_CHANGES_TTL
+        )
+    transaction.on_commit(write)
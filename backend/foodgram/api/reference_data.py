@@ -0,0 +1,140 @@
+import gzip
+import hashlib
+import threading
+import time
+import uuid
+
+import brotli
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+from recipes.catalog import current_version, local_data_ttl, shared_cache
+from recipes.models import Ingredient, Tag
+from rest_framework.renderers import JSONRenderer
+
+from .ingredient_index import VERSION_CACHE_KEY as INGREDIENTS_VERSION_KEY
+from .metrics import record_cache
+from .row_serializers import INGREDIENT, TAG
+
+TAGS_VERSION_CACHE_KEY = 'tags_version'
+ENCODINGS = ('br', 'gzip')
+
+
+def accepted_encodings(request):
+    """Кодировки из Accept-Encoding, кроме запрещенных через q=0"""
+    accepted = set()
+    for item in request.META.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        name, _, params = item.partition(';')
+        params = params.strip()
+        try:
+            if params.startswith('q=') and float(params[2:]) == 0:
+                continue
+        except ValueError:
+            continue
+        accepted.add(name.strip().lower())
+    return accepted
+
+
+class ReferenceData:
+    """
+    Готовый JSON-ответ со всей таблицей справочника в памяти процесса:
+    тело, его сжатые gzip и brotli версии и ETag. Пересобирается, когда
+    меняется версия в общем кэше VERSION_CACHE_ALIAS (её обновляют
+    сигналы модели) или истекает REFERENCE_DATA_TTL. Без общего кэша
+    изменения из других процессов видны через UNSHARED_DATA_TTL.
+    """
+
+    def __init__(self, name, version_key, queryset, mapper):
+        self.name = name
+        self.version_key = version_key
+        self.queryset = queryset
+        self.mapper = mapper
+        self.lock = threading.Lock()
+        self.version = None
+        self.built_at = None
+        self.data = None
+
+    def build(self):
+        body = JSONRenderer().render(self.mapper.many(self.queryset.all()))
+        self.data = (
+            f'W/"{hashlib.sha1(body).hexdigest()}"',
+            {
+                None: body,
+                'br': brotli.compress(body),
+                'gzip': gzip.compress(body, compresslevel=9),
+            }
+        )
+
+    def is_stale(self, version, shared):
+        return (
+            self.built_at is None
+            or version != self.version
+            or time.monotonic() - self.built_at > local_data_ttl(
+                settings.REFERENCE_DATA_TTL, shared
+            )
+        )
+
+    def refresh(self):
+        shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+        version = (
+            current_version(shared, self.version_key)
+            if shared is not None else None
+        )
+        if not self.is_stale(version, shared):
+            record_cache(self.name, hit=True)
+            return
+        record_cache(self.name, hit=False)
+        with self.lock:
+            if self.is_stale(version, shared):
+                self.build()
+                self.version = version
+                self.built_at = time.monotonic()
+
+    def response(self, request):
+        """Ответ 304 по If-None-Match или тело в лучшей из кодировок"""
+        self.refresh()
+        etag, bodies = self.data
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            accepted = accepted_encodings(request)
+            encoding = next(
+                (name for name in ENCODINGS if name in accepted), None
+            )
+            response = HttpResponse(
+                bodies[encoding], content_type='application/json'
+            )
+            if encoding is not None:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+def invalidate_tags():
+    """
+    Помечает готовые списки тегов во всех процессах устаревшими.
+    Без общего кэша сразу пересобирается только список этого процесса.
+    """
+    tags_data.built_at = None
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is not None:
+        shared.set(TAGS_VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_ingredients():
+    """
+    Сбрасывает готовый список ингредиентов этого процесса. Версию
+    в общем кэше меняет ingredient_index.invalidate.
+    """
+    ingredients_data.built_at = None
+
+
+tags_data = ReferenceData(
+    'tags_data', TAGS_VERSION_CACHE_KEY, Tag.objects.all(), TAG
+)
+ingredients_data = ReferenceData(
+    'ingredients_data', INGREDIENTS_VERSION_KEY,
+    Ingredient.objects.all(), INGREDIENT
+)
@@ -0,0 +1,117 @@
+import hashlib
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import CharField, Value
+from recipes.catalog import catalog_version
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+from .metrics import record_cache
+
+PRIVATE_PARAMS = ('is_favorited', 'is_in_shopping_cart')
+MAX_CACHED_RESULTS = 100
+
+
+def response_cache():
+    alias = settings.RECIPE_LIST_CACHE_ALIAS
+    return caches[alias] if alias else None
+
+
+def cache_key(request):
+    """
+    Ключ ответа со списком рецептов: версия каталога и адрес запроса
+    с упорядоченными параметрами. None, если ответ зависит от
+    пользователя не только флагами избранного, корзины и подписки
+    или если версию каталога негде хранить.
+    """
+    params = request.query_params
+    version = catalog_version()
+    if response_cache() is None or version is None or (
+        request.user.is_authenticated and (
+            params.get('author') == 'me'
+            or any(params.get(name, '0') != '0' for name in PRIVATE_PARAMS)
+        )
+    ):
+        return None
+    query = urlencode(sorted(
+        (name, value)
+        for name, values in params.lists()
+        for value in values
+    ))
+    url = f'{request.build_absolute_uri(request.path)}?{query}'
+    return 'recipe_list:{}:{}'.format(
+        version, hashlib.md5(url.encode()).hexdigest()
+    )
+
+
+def get_cached(key):
+    """Пара (сводка выборки для ETag, общий ответ) или None"""
+    cache = response_cache()
+    entry = cache.get(key) if cache is not None else None
+    record_cache('recipe_list', hit=entry is not None)
+    return entry
+
+
+def set_cached(key, entry):
+    cache = response_cache()
+    if cache is not None and len(entry[1]['results']) <= MAX_CACHED_RESULTS:
+        cache.set(key, entry)
+
+
+def user_flags(user, recipe_ids, author_ids):
+    """Избранное, корзина и подписки user среди страницы одним запросом"""
+    def marked(queryset, field, kind):
+        return queryset.filter(user=user).order_by().annotate(
+            kind=Value(kind, output_field=CharField())
+        ).values_list(field, 'kind')
+
+    rows = marked(
+        Favorite.objects.filter(recipe_id__in=recipe_ids),
+        'recipe_id', 'favorite'
+    ).union(
+        marked(
+            ShoppingCart.objects.filter(recipe_id__in=recipe_ids),
+            'recipe_id', 'cart'
+        ),
+        marked(
+            Follow.objects.filter(following_id__in=author_ids),
+            'following_id', 'follow'
+        ),
+        all=True
+    )
+    flags = {'favorite': set(), 'cart': set(), 'follow': set()}
+    for pk, kind in rows:
+        flags[kind].add(pk)
+    return flags
+
+
+def with_user_flags(data, user):
+    """Общий для всех ответ с флагами конкретного пользователя"""
+    results = data['results']
+    if user.is_anonymous or not results:
+        return data
+    recipe_flags = {'is_favorited', 'is_in_shopping_cart'} & results[0].keys()
+    with_author = 'author' in results[0]
+    if not recipe_flags and not with_author:
+        return data
+    flags = user_flags(
+        user,
+        [recipe['id'] for recipe in results] if recipe_flags else [],
+        {recipe['author']['id'] for recipe in results} if with_author else []
+    )
+    marked = []
+    for recipe in results:
+        recipe = dict(recipe)
+        if 'is_favorited' in recipe_flags:
+            recipe['is_favorited'] = recipe['id'] in flags['favorite']
+        if 'is_in_shopping_cart' in recipe_flags:
+            recipe['is_in_shopping_cart'] = recipe['id'] in flags['cart']
+        if with_author:
+            recipe['author'] = dict(
+                recipe['author'],
+                is_subscribed=recipe['author']['id'] in flags['follow']
+            )
+        marked.append(recipe)
+    return dict(data, results=marked)
@@ -0,0 +1,159 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from recipes.models import Recipe, RecipeIngredient
+
+from .serializers import absolute_url, rendition_urls
+
+
+class RowMapper:
+    """
+    Словари ответа из кортежей values_list без объектов моделей и полей
+    DRF. Поля задаются один раз: ключ в ответе, поле выборки и, если
+    нужно, преобразование значения. Порядок ключей - как в сериализаторе,
+    которому соответствует RowMapper.
+    """
+
+    def __init__(self, *fields):
+        self.keys = tuple(field[0] for field in fields)
+        self.lookups = tuple(field[1] for field in fields)
+        self.converters = tuple(
+            (index, field[2])
+            for index, field in enumerate(fields) if len(field) > 2
+        )
+
+    def __call__(self, row):
+        if self.converters:
+            row = list(row)
+            for index, convert in self.converters:
+                row[index] = convert(row[index])
+        return dict(zip(self.keys, row))
+
+    def rows(self, queryset):
+        return queryset.values_list(*self.lookups)
+
+    def many(self, queryset):
+        return [self(row) for row in self.rows(queryset)]
+
+
+INGREDIENT = RowMapper(
+    ('id', 'id'),
+    ('name', 'name'),
+    ('measurement_unit', 'measurement_unit')
+)
+TAG = RowMapper(
+    ('id', 'id'),
+    ('name', 'name'),
+    ('color', 'color'),
+    ('slug', 'slug')
+)
+USER = RowMapper(
+    ('id', 'id'),
+    ('email', 'email'),
+    ('username', 'username'),
+    ('first_name', 'first_name'),
+    ('last_name', 'last_name')
+)
+RECIPE_TAG = RowMapper(
+    ('id', 'tag_id'),
+    ('name', 'tag__name'),
+    ('color', 'tag__color'),
+    ('slug', 'tag__slug')
+)
+RECIPE_INGREDIENT = RowMapper(
+    ('id', 'ingredient_id', str),
+    ('name', 'ingredient__name'),
+    ('measurement_unit', 'ingredient__measurement_unit'),
+    ('amount', 'amount')
+)
+AUTHOR = RowMapper(
+    ('id', 'author_id'),
+    ('email', 'author__email'),
+    ('username', 'author__username'),
+    ('first_name', 'author__first_name'),
+    ('last_name', 'author__last_name')
+)
+RECIPE_KEYS = (
+    'id', 'tags', 'author', 'ingredients', 'is_favorited',
+    'is_in_shopping_cart', 'name', 'image', 'images', 'text', 'cooking_time'
+)
+RECIPE_COLUMNS = {
+    'author': ('author_subscribed',) + AUTHOR.lookups,
+    'is_favorited': ('favorited',),
+    'is_in_shopping_cart': ('in_shopping_cart',),
+    'name': ('name',),
+    'image': ('image',),
+    'images': ('image', 'image_processed'),
+    'text': ('text',),
+    'cooking_time': ('cooking_time',),
+}
+
+
+def recipe_rows(queryset, fields=None):
+    """
+    Строки рецептов для recipes_data из выборки for_read: только
+    столбцы для полей fields (или всех). Именованные кортежи, чтобы
+    пагинация по ключу могла прочитать pub_date.
+    """
+    columns = ['id', 'pub_date']
+    for key in RECIPE_KEYS:
+        if fields is None or key in fields:
+            columns.extend(
+                column for column in RECIPE_COLUMNS.get(key, ())
+                if column not in columns
+            )
+    return queryset.prefetch_related(None).values_list(*columns, named=True)
+
+
+def grouped(mapper, queryset):
+    """{id рецепта: [словари mapper]} одним запросом"""
+    groups = defaultdict(list)
+    for recipe_id, *row in queryset.values_list('recipe_id', *mapper.lookups):
+        groups[recipe_id].append(mapper(row))
+    return groups
+
+
+def image_url(name, request):
+    if not name:
+        return None
+    return absolute_url(default_storage.url(name), request)
+
+
+def recipes_data(rows, request, fields=None):
+    """
+    То же, что ReadRecipeSerializer(many=True).data с теми же fields:
+    теги и ингредиенты - по запросу, если они есть среди полей.
+    """
+    ids = [row.id for row in rows]
+    if not ids:
+        return []
+    keys = [key for key in RECIPE_KEYS if fields is None or key in fields]
+    tags = grouped(RECIPE_TAG, Recipe.tags.through.objects.filter(
+        recipe_id__in=ids
+    ).order_by('tag__name')) if 'tags' in keys else None
+    ingredients = grouped(
+        RECIPE_INGREDIENT, RecipeIngredient.objects.filter(recipe_id__in=ids)
+    ) if 'ingredients' in keys else None
+    author_start = (
+        rows[0]._fields.index(AUTHOR.lookups[0]) if 'author' in keys else None
+    )
+    builders = {
+        'id': lambda row: row.id,
+        'tags': lambda row: tags.get(row.id, []),
+        'author': lambda row: dict(
+            AUTHOR(row[author_start:author_start + len(AUTHOR.lookups)]),
+            is_subscribed=row.author_subscribed
+        ),
+        'ingredients': lambda row: ingredients.get(row.id, []),
+        'is_favorited': lambda row: row.favorited,
+        'is_in_shopping_cart': lambda row: row.in_shopping_cart,
+        'name': lambda row: row.name,
+        'image': lambda row: image_url(row.image, request),
+        'images': lambda row: rendition_urls(
+            row.image, row.image_processed, request
+        ) if row.image else None,
+        'text': lambda row: row.text,
+        'cooking_time': lambda row: row.cooking_time,
+    }
+    selected = [(key, builders[key]) for key in keys]
+    return [{key: build(row) for key, build in selected} for row in rows]
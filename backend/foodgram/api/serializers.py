@@ -1,24 +1,94 @@
 import base64
+import binascii
 
+from django.conf import settings
 from django.core.files.base import ContentFile
-from django.shortcuts import get_object_or_404
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image
+from recipes.cart import change_recipe_in_carts
+from recipes.images import rendition_names, schedule_renditions
+from recipes.models import (CartIngredient, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.search import suspend_search_updates, update_search_documents
 from rest_framework import serializers
-from users.serializers import AuthorSerializer, UserSerializer
+from users.serializers import AuthorSerializer
 
+from .recipe_index import record_change
+from .sparse_fields import SparseFieldsMixin
 from .validatiors import validate_ingredient
 
 
 class Base64ImageField(serializers.ImageField):
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
+            try:
+                format, imgstr = data.split(';base64,')
+            except ValueError:
+                raise serializers.ValidationError('Некорректная картинка')
+            if len(imgstr) * 3 // 4 > settings.IMAGE_MAX_BYTES:
+                raise serializers.ValidationError(
+                    'Картинка слишком большая'
+                )
+            try:
+                content = base64.b64decode(imgstr, validate=True)
+            except (binascii.Error, ValueError):
+                raise serializers.ValidationError('Некорректная картинка')
             ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            data = ContentFile(content, name='temp.' + ext)
+        if hasattr(data, 'read'):
+            if data.size > settings.IMAGE_MAX_BYTES:
+                raise serializers.ValidationError('Картинка слишком большая')
+            validate_image_dimensions(data)
         return super(Base64ImageField, self).to_internal_value(data)
 
 
+class ImageRenditionsField(serializers.ReadOnlyField):
+    """Ссылки на уменьшенные копии картинки, пока их нет - на оригинал"""
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        if not recipe.image:
+            return None
+        return rendition_urls(
+            recipe.image.name, recipe.image_processed,
+            self.context.get('request')
+        )
+
+
+def absolute_url(url, request):
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+def rendition_urls(image_name, processed, request):
+    """Ссылки на уменьшенные копии картинки, пока их нет - на оригинал"""
+    names = rendition_names(image_name)
+    if not processed:
+        names = dict.fromkeys(names, image_name)
+    return {
+        key: absolute_url(default_storage.url(name), request)
+        for key, name in names.items()
+    }
+
+
+def validate_image_dimensions(file):
+    """Проверяет размеры по заголовку, не декодируя картинку целиком"""
+    try:
+        with Image.open(file) as image:
+            width, height = image.size
+    except (OSError, Image.DecompressionBombError):
+        raise serializers.ValidationError('Некорректная картинка')
+    finally:
+        file.seek(0)
+    if width * height > settings.IMAGE_MAX_PIXELS:
+        raise serializers.ValidationError(
+            'Слишком большое разрешение картинки'
+        )
+
+
 class IngredientSerializer(serializers.ModelSerializer):
     """Сериализатор для Ингредиентов"""
     class Meta:
@@ -118,66 +188,71 @@ class WriteRecipeSerializer(serializers.ModelSerializer):
         ]
 
     def get_ingredients(self, obj):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe=obj
-        )
+        ingredients = obj.recipe_ingredient.all()
+        if 'recipe_ingredient' not in getattr(
+            obj, '_prefetched_objects_cache', {}
+        ):
+            ingredients = ingredients.select_related('ingredient')
         return RecipeIngredientSerializer(
             ingredients,
             many=True).data
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         return favorite_or_shop_cart(self, obj, Favorite)
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         return favorite_or_shop_cart(self, obj, ShoppingCart)
 
+    @transaction.atomic
     def create(self, validated_data):
-        ingredients = self.initial_data.get('ingredients')
-        validate_ingredient(ingredients)
+        amounts = validate_ingredient(self.initial_data.get('ingredients'))
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        for ingredient_data in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=ingredient_data.get('id')
+        with suspend_search_updates():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.set(tags)
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe,
+                    ingredient_id=ingredient_id,
+                    amount=amount
+                )
+                for ingredient_id, amount in amounts.items()
             )
-            amount = int(ingredient_data.get('amount'))
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient,
-                amount=amount
-            )
-        for tag in tags:
-            recipe.tags.add(tag)
+        update_search_documents([recipe.id])
+        record_change(recipe.id)
+        schedule_renditions(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients = self.initial_data.get('ingredients')
-        validate_ingredient(ingredients)
+        amounts = validate_ingredient(self.initial_data.get('ingredients'))
         tags = validated_data.pop('tags')
-        super().update(instance, validated_data)
-        RecipeIngredient.objects.filter(recipe=instance).delete()
-        instance.tags.clear()
-        for ingredient_data in ingredients:
-            ingredient = get_object_or_404(
-                Ingredient,
-                id=ingredient_data.get('id')
-            )
-            RecipeIngredient.objects.create(
-                recipe=instance,
-                ingredient=ingredient,
-                amount=ingredient_data.get('amount')
+        if 'image' in validated_data:
+            validated_data['image_processed'] = False
+        with suspend_search_updates(instance.id):
+            super().update(instance, validated_data)
+            instance.tags.set(tags)
+            deltas = update_recipe_ingredients(instance, amounts)
+        update_search_documents([instance.id])
+        if deltas:
+            change_recipe_in_carts(
+                CartIngredient, ShoppingCart, instance.id, deltas
             )
-        for tag in tags:
-            instance.tags.add(tag)
-        instance.save()
+        record_change(instance.id)
+        if 'image' in validated_data:
+            schedule_renditions(instance)
         return instance
 
 
-class ReadRecipeSerializer(WriteRecipeSerializer):
+class ReadRecipeSerializer(SparseFieldsMixin, WriteRecipeSerializer):
     """Сериализатор для просмотра рецептов"""
-    author = UserSerializer(read_only=True)
+    author = AuthorSerializer(read_only=True)
     tags = TagSerializer(read_only=True, many=True)
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -190,14 +265,32 @@ class ReadRecipeSerializer(WriteRecipeSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'images',
             'text',
             'cooking_time'
         )
 
+    def to_representation(self, instance):
+        if 'author' in self.fields and hasattr(instance, 'author_subscribed'):
+            instance.author.is_subscribed = instance.author_subscribed
+        return super().to_representation(instance)
+
+
+class PantryRecipeSerializer(ReadRecipeSerializer):
+    """Сериализатор рецептов, подобранных по имеющимся ингредиентам"""
+    missing_ingredients = serializers.SerializerMethodField()
+
+    class Meta(ReadRecipeSerializer.Meta):
+        fields = ReadRecipeSerializer.Meta.fields + ('missing_ingredients',)
+
+    def get_missing_ingredients(self, obj):
+        return self.context['missing'][obj.id]
+
 
 class CartSerializer(serializers.ModelSerializer):
     """Сериализатор для списка покупок"""
     image = Base64ImageField()
+    images = ImageRenditionsField()
 
     class Meta:
         model = Recipe
@@ -205,10 +298,57 @@ class CartSerializer(serializers.ModelSerializer):
             'id',
             'name',
             'image',
+            'images',
             'cooking_time'
         )
 
 
+def update_recipe_ingredients(recipe, amounts):
+    """
+    Приводит ингредиенты рецепта к amounts, меняя только отличия.
+    Возвращает изменения количеств {ингредиент: разница},
+    пустые, если состав рецепта не изменился.
+    """
+    current = {
+        item.ingredient_id: item
+        for item in recipe.recipe_ingredient.all()
+    }
+    deltas = {
+        ingredient_id: amounts.get(ingredient_id, 0) - (
+            current[ingredient_id].amount if ingredient_id in current else 0
+        )
+        for ingredient_id in current.keys() | amounts.keys()
+    }
+    removed = current.keys() - amounts.keys()
+    if removed:
+        RecipeIngredient.objects.filter(
+            recipe=recipe,
+            ingredient_id__in=removed
+        ).delete()
+    changed = []
+    for ingredient_id, amount in amounts.items():
+        item = current.get(ingredient_id)
+        if item is not None and item.amount != amount:
+            item.amount = amount
+            changed.append(item)
+    if changed:
+        RecipeIngredient.objects.bulk_update(changed, ['amount'])
+    added = [
+        RecipeIngredient(
+            recipe=recipe,
+            ingredient_id=ingredient_id,
+            amount=amounts[ingredient_id]
+        )
+        for ingredient_id in amounts.keys() - current.keys()
+    ]
+    if added:
+        RecipeIngredient.objects.bulk_create(added)
+    return {
+        ingredient_id: delta for ingredient_id, delta in deltas.items()
+        if delta
+    }
+
+
 def favorite_or_shop_cart(self, obj, model):
     user = self.context.get('request').user
     if user.is_anonymous:
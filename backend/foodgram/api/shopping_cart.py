@@ -0,0 +1,89 @@
+import csv
+import io
+from itertools import chain
+
+from django.conf import settings
+from recipes.models import CartIngredient
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import cm
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+PDF_FONT_NAME = 'ShoppingCartFont'
+PDF_CHUNK_SIZE = 64 * 1024
+
+
+def get_shopping_list(user):
+    """Суммы ингредиентов из сводной корзины пользователя"""
+    return CartIngredient.objects.filter(
+        user=user
+    ).order_by(
+        'ingredient__name'
+    ).values_list(
+        'ingredient__name',
+        'ingredient__measurement_unit',
+        'amount'
+    )
+
+
+def render_txt(user, ingredients):
+    yield f'{user.username} вот твой список покупок \n'
+    for name, measurement_unit, amount in ingredients.iterator():
+        yield f'{name} ({measurement_unit}) - {amount}\n'
+    yield 'foodgram'
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: отдает строку вместо записи"""
+
+    def write(self, value):
+        return value
+
+
+def render_csv(user, ingredients):
+    writer = csv.writer(Echo())
+    yield writer.writerow(['Ингредиент', 'Единица измерения', 'Количество'])
+    for row in ingredients.iterator():
+        yield writer.writerow(row)
+
+
+def get_pdf_font():
+    if PDF_FONT_NAME not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(
+            TTFont(PDF_FONT_NAME, settings.SHOPPING_CART_PDF_FONT)
+        )
+    return PDF_FONT_NAME
+
+
+def render_pdf(user, ingredients):
+    buffer = io.BytesIO()
+    page = canvas.Canvas(buffer, pagesize=A4)
+    font = get_pdf_font()
+    _, height = A4
+    top, bottom, line_height = height - 2 * cm, 2 * cm, 0.7 * cm
+    page.setFont(font, 16)
+    page.drawString(2 * cm, top, f'{user.username} вот твой список покупок')
+    page.setFont(font, 12)
+    y = top - 2 * line_height
+    lines = (
+        f'{name} ({measurement_unit}) - {amount}'
+        for name, measurement_unit, amount in ingredients.iterator()
+    )
+    for line in chain(lines, ['', 'foodgram']):
+        if y < bottom:
+            page.showPage()
+            page.setFont(font, 12)
+            y = top
+        page.drawString(2 * cm, y, line)
+        y -= line_height
+    page.save()
+    buffer.seek(0)
+    return iter(lambda: buffer.read(PDF_CHUNK_SIZE), b'')
+
+
+SHOPPING_CART_RENDERERS = {
+    'txt': (render_txt, 'text/plain;charset=UTF-8'),
+    'csv': (render_csv, 'text/csv;charset=UTF-8'),
+    'pdf': (render_pdf, 'application/pdf'),
+}
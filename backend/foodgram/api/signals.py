@@ -0,0 +1,25 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipe, Tag
+
+from .ingredient_index import invalidate
+from .recipe_index import record_change
+from .reference_data import invalidate_ingredients, invalidate_tags
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    invalidate()
+    invalidate_ingredients()
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tags_data(sender, **kwargs):
+    invalidate_tags()
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_similar_recipe(sender, instance, **kwargs):
+    record_change(instance.id)
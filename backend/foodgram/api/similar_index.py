@@ -0,0 +1,115 @@
+import numpy as np
+from recipes.models import Recipe
+from scipy import sparse
+
+from .recipe_index import RecipeIndex, load_features
+
+TAG_WEIGHT = 0.5
+
+
+def normalize(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+class SimilarRecipesIndex(RecipeIndex):
+    """
+    Разреженная матрица рецепт x (ингредиенты и теги) с весами IDF
+    и нормированными строками: скалярное произведение строк - косинусная
+    близость рецептов.
+    """
+    name = 'similar_index'
+    ttl_setting = 'SIMILAR_INDEX_TTL'
+    max_changes_setting = 'SIMILAR_INDEX_MAX_CHANGES'
+
+    def build(self):
+        recipe_ids = np.array(
+            Recipe.objects.order_by('id').values_list('id', flat=True),
+            dtype=np.int64
+        )
+        recipes, features = load_features()
+        known = np.isin(recipes, recipe_ids)
+        recipes, features = recipes[known], features[known]
+        feature_keys, columns = np.unique(features, return_inverse=True)
+        frequency = np.bincount(columns, minlength=len(feature_keys))
+        weights = np.log(max(len(recipe_ids), 1) / frequency)
+        weights[feature_keys < 0] *= TAG_WEIGHT
+        matrix = sparse.csr_matrix(
+            (
+                weights[columns],
+                (np.searchsorted(recipe_ids, recipes), columns)
+            ),
+            shape=(len(recipe_ids), len(feature_keys))
+        )
+        self.set_data(
+            normalize(matrix),
+            recipe_ids,
+            {int(pk): row for row, pk in enumerate(recipe_ids)},
+            feature_keys,
+            weights
+        )
+
+    def set_data(self, matrix, recipe_ids, rows, feature_keys, weights):
+        """Матрица хранится и транспонированной: близость к рецепту
+        считается сложением строк только его признаков"""
+        matrix = matrix.tocsr()
+        self.data = (
+            matrix, matrix.T.tocsr(), recipe_ids, rows, feature_keys, weights
+        )
+
+    def apply_changes(self, changed):
+        """Обнуляет строки измененных рецептов и дописывает новые"""
+        matrix, _, recipe_ids, rows, feature_keys, weights = self.data
+        rows = dict(rows)
+        keep = np.ones(matrix.shape[0])
+        for pk in changed:
+            row = rows.pop(pk, None)
+            if row is not None:
+                keep[row] = 0
+        matrix = sparse.diags(keep) @ matrix
+        existing = list(Recipe.objects.filter(
+            id__in=changed
+        ).values_list('id', flat=True))
+        if existing:
+            recipes, features = load_features(existing)
+            columns = np.searchsorted(feature_keys, features).clip(
+                max=len(feature_keys) - 1
+            )
+            known = feature_keys[columns] == features
+            existing = np.array(sorted(existing), dtype=np.int64)
+            added = sparse.csr_matrix(
+                (
+                    weights[columns[known]],
+                    (np.searchsorted(existing, recipes[known]),
+                     columns[known])
+                ),
+                shape=(len(existing), len(feature_keys))
+            )
+            for offset, pk in enumerate(existing):
+                rows[int(pk)] = matrix.shape[0] + offset
+            matrix = sparse.vstack([matrix, normalize(added)])
+            recipe_ids = np.concatenate([recipe_ids, existing])
+        self.set_data(matrix, recipe_ids, rows, feature_keys, weights)
+
+    def is_empty(self):
+        return not len(self.data[4])
+
+    def similar(self, recipe_id, limit):
+        """id до limit самых похожих рецептов, по убыванию близости"""
+        self.refresh()
+        matrix, transposed, recipe_ids, rows, _, _ = self.data
+        row = rows.get(recipe_id)
+        if row is None:
+            return []
+        scores = (matrix[row] @ transposed).toarray().ravel()
+        scores[row] = 0
+        if limit < len(scores):
+            top = np.argpartition(-scores, limit)[:limit]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [int(recipe_ids[index]) for index in top if scores[index] > 0]
+
+
+similar_index = SimilarRecipesIndex()
@@ -0,0 +1,65 @@
+from collections import OrderedDict
+
+from rest_framework import serializers
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+
+
+def requested_fields(request, available):
+    """
+    Поля ответа по параметрам fields и omit (имена через запятую)
+    или None, если нужны все поля из available. Неизвестные имена
+    и пустой итоговый набор - ошибка валидации.
+    """
+    if request is None:
+        return None
+    params = request.query_params
+    if FIELDS_PARAM not in params and OMIT_PARAM not in params:
+        return None
+    available = set(available)
+    fields = available
+    for param in (FIELDS_PARAM, OMIT_PARAM):
+        if param not in params:
+            continue
+        names = {
+            name.strip()
+            for value in params.getlist(param)
+            for name in value.split(',') if name.strip()
+        }
+        unknown = names - available
+        if unknown:
+            raise serializers.ValidationError({
+                param: [f'Неизвестные поля: {", ".join(sorted(unknown))}']
+            })
+        fields = names if param == FIELDS_PARAM else fields - names
+        if not fields:
+            raise serializers.ValidationError({
+                param: ['Не осталось ни одного поля']
+            })
+    return fields
+
+
+class SparseFieldsMixin:
+    """
+    Оставляет в ответе только поля, выбранные параметрами fields и omit
+    запроса. Действует только на корневой сериализатор ответа: вложенные
+    (автор в рецепте) отдаются целиком.
+    """
+
+    def get_fields(self):
+        fields = super().get_fields()
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        if parent is not None:
+            return fields
+        selected = requested_fields(self.context.get('request'), [
+            name for name, field in fields.items() if not field.write_only
+        ])
+        if selected is None:
+            return fields
+        return OrderedDict(
+            (name, field) for name, field in fields.items()
+            if name in selected or field.write_only
+        )
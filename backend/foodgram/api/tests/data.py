@@ -0,0 +1,49 @@
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from users.models import Follow, User
+
+
+def create_catalog(recipes_count=60):
+    """
+    Небольшой каталог для тестов: два автора, подписчик с избранным
+    и подпиской, теги и ингредиенты у каждого рецепта.
+    """
+    authors = [
+        User.objects.create_user(
+            username=f'author{number}', email=f'author{number}@example.com',
+            password='password', first_name='Автор', last_name=str(number)
+        )
+        for number in range(2)
+    ]
+    reader = User.objects.create_user(
+        username='reader', email='reader@example.com', password='password',
+        first_name='Читатель', last_name='Тестовый'
+    )
+    tags = [
+        Tag.objects.create(
+            name=f'Тег {number}', color=f'#00000{number}', slug=f'tag{number}'
+        )
+        for number in range(3)
+    ]
+    ingredients = [
+        Ingredient.objects.create(
+            name=f'Ингредиент {number}', measurement_unit='г'
+        )
+        for number in range(5)
+    ]
+    recipes = []
+    for number in range(recipes_count):
+        recipe = Recipe.objects.create(
+            author=authors[number % 2], name=f'Рецепт {number}',
+            image='recipes/images/test.png', text=f'Описание {number}',
+            cooking_time=number % 30 + 1
+        )
+        recipe.tags.set(tags[:number % 3 + 1])
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=10)
+            for ingredient in ingredients[:number % 5 + 1]
+        )
+        recipes.append(recipe)
+    Follow.objects.create(user=reader, following=authors[0])
+    for recipe in recipes[::7]:
+        reader.favorites.create(recipe=recipe)
+    return authors, reader, recipes
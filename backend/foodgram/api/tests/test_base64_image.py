@@ -0,0 +1,32 @@
+from api.serializers import Base64ImageField
+from django.test import SimpleTestCase
+from rest_framework import serializers
+
+PIXEL = (
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mP8z8BQDwAEhQGAhKmMIQAAAABJRU5ErkJggg=='
+)
+
+
+class Base64ImageFieldTest(SimpleTestCase):
+    """Некорректная картинка в base64 - ошибка валидации, а не 500"""
+
+    def test_invalid_base64(self):
+        for payload in ('abc', 'ab$c', 'aGVsbG8'):
+            with self.subTest(payload=payload):
+                with self.assertRaises(serializers.ValidationError):
+                    Base64ImageField().to_internal_value(
+                        f'data:image/png;base64,{payload}'
+                    )
+
+    def test_not_an_image(self):
+        with self.assertRaises(serializers.ValidationError):
+            Base64ImageField().to_internal_value(
+                'data:image/png;base64,aGVsbG8='
+            )
+
+    def test_valid_image(self):
+        image = Base64ImageField().to_internal_value(
+            f'data:image/png;base64,{PIXEL}'
+        )
+        self.assertEqual(image.name, 'temp.png')
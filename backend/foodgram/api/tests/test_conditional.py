@@ -0,0 +1,93 @@
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+LIST_URL = '/api/recipes/?limit=5'
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class ConditionalGetTest(TransactionTestCase):
+    """
+    ETag и Last-Modified рецептов. TransactionTestCase: версии списков
+    пользователя меняются в transaction.on_commit.
+    """
+
+    def setUp(self):
+        self.authors, self.reader, self.recipes = create_catalog(10)
+        for alias in ('shared', 'recipe_lists'):
+            caches[alias].clear()
+        self.recipe = self.recipes[-1]
+        self.detail_url = f'/api/recipes/{self.recipe.id}/'
+
+    def etag(self, client, url):
+        response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def assert_not_modified(self, client, url, etag):
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_anonymous(self):
+        client = APIClient()
+        for url in (LIST_URL, self.detail_url):
+            with self.subTest(url=url):
+                self.assert_not_modified(client, url, self.etag(client, url))
+        response = client.get(self.detail_url)
+        self.assertEqual(client.get(
+            self.detail_url,
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified']
+        ).status_code, 304)
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        for url in (LIST_URL, self.detail_url):
+            with self.subTest(url=url):
+                etag = self.etag(client, url)
+                self.assert_not_modified(client, url, etag)
+                self.assertNotEqual(etag, self.etag(APIClient(), url))
+        response = client.get(self.detail_url)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_favorite_changes_user_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        etag = self.etag(client, self.detail_url)
+        anonymous_etag = self.etag(APIClient(), self.detail_url)
+        client.post(f'{self.detail_url}favorite/')
+        self.assertEqual(
+            client.get(
+                self.detail_url, HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            200
+        )
+        self.assert_not_modified(APIClient(), self.detail_url, anonymous_etag)
+
+    def test_edit_changes_etag(self):
+        client = APIClient()
+        etags = {
+            url: self.etag(client, url)
+            for url in (LIST_URL, self.detail_url)
+        }
+        author = APIClient()
+        author.force_authenticate(self.recipe.author)
+        response = author.patch(self.detail_url, {
+            'name': 'Новое название',
+            'tags': list(self.recipe.tags.values_list('id', flat=True)),
+            'ingredients': [
+                {'id': pk, 'amount': 1}
+                for pk in self.recipe.ingredients.values_list(
+                    'id', flat=True
+                )
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        for url, etag in etags.items():
+            with self.subTest(url=url):
+                response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,105 @@
+from api.views import add_to_recipes_list
+from django.test import TestCase
+from recipes.models import CartIngredient, Favorite, Recipe, ShoppingCart
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+
+class RecipesListsTest(TestCase):
+    """
+    Избранное и корзина: список меняется одним INSERT или DELETE,
+    остальные запросы - чтение рецепта, счетчик и сводная корзина.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(10)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.recipe = self.recipes[1]
+        self.ids = [recipe.id for recipe in self.recipes[1:4]]
+
+    def counter(self, recipe_id, field):
+        return Recipe.objects.values_list(field, flat=True).get(id=recipe_id)
+
+    def test_favorite_toggle(self):
+        url = f'/api/recipes/{self.recipe.id}/favorite/'
+        # рецепт, INSERT, счетчик
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.post(url).status_code, 201)
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.post(url).status_code, 400)
+        self.assertEqual(self.counter(self.recipe.id, 'favorites_count'), 1)
+        # DELETE, счетчик
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.delete(url).status_code, 204)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.delete(url).status_code, 400)
+        self.assertEqual(self.counter(self.recipe.id, 'favorites_count'), 0)
+
+    def test_add_is_idempotent(self):
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        # Строку уже вставил параллельный запрос
+        self.assertEqual(
+            add_to_recipes_list(Favorite, self.reader, [self.recipe.id]), []
+        )
+        self.assertEqual(self.counter(self.recipe.id, 'favorites_count'), 0)
+
+    def test_favorite_bulk(self):
+        url = '/api/recipes/favorite/'
+        self.client.post(f'/api/recipes/{self.recipe.id}/favorite/')
+        with self.assertNumQueries(3):
+            response = self.client.post(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            sorted(recipe['id'] for recipe in response.data), self.ids[1:]
+        )
+        response = self.client.post(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [self.counter(pk, 'favorites_count') for pk in self.ids],
+            [1, 1, 1]
+        )
+        with self.assertNumQueries(2):
+            response = self.client.delete(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(
+            Favorite.objects.filter(recipe_id__in=self.ids).exists()
+        )
+        self.assertEqual(
+            [self.counter(pk, 'favorites_count') for pk in self.ids],
+            [0, 0, 0]
+        )
+        response = self.client.delete(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_shopping_cart_bulk(self):
+        url = '/api/recipes/shopping_cart/'
+        response = self.client.post(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 201)
+        response = self.client.post(url, {'recipes': self.ids}, 'json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.reader).count(), 3
+        )
+        self.assertEqual(
+            dict(CartIngredient.objects.filter(
+                user=self.reader
+            ).values_list('ingredient__name', 'amount')),
+            {'Ингредиент 0': 30, 'Ингредиент 1': 30, 'Ингредиент 2': 20,
+             'Ингредиент 3': 10}
+        )
+        response = self.client.delete(
+            url, {'recipes': self.ids[:2]}, 'json'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            dict(CartIngredient.objects.filter(
+                user=self.reader
+            ).values_list('ingredient__name', 'amount')),
+            {'Ингредиент 0': 10, 'Ингредиент 1': 10, 'Ингредиент 2': 10,
+             'Ингредиент 3': 10}
+        )
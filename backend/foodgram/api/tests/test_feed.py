@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from recipes.models import FeedEntry, Recipe
+from rest_framework.test import APIClient
+from users.models import Follow, User
+
+from .data import create_catalog
+
+
+class FanOutTest(TestCase):
+    """Рецепт автора с множеством подписчиков не раскладывается по лентам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(2)
+        for number in range(2):
+            Follow.objects.create(
+                user=User.objects.create_user(
+                    username=f'follower{number}',
+                    email=f'follower{number}@example.com',
+                    password='password'
+                ),
+                following=cls.authors[0]
+            )
+
+    def create_recipe(self):
+        return Recipe.objects.create(
+            author=self.authors[0], name='Новый рецепт',
+            image='recipes/images/test.png', text='Описание', cooking_time=5
+        )
+
+    def test_small_audience_gets_entries(self):
+        recipe = self.create_recipe()
+        self.assertEqual(FeedEntry.objects.filter(recipe=recipe).count(), 3)
+
+    @override_settings(FEED_FAN_OUT_FOLLOWERS=2)
+    def test_large_audience_is_merged_on_read(self):
+        recipe = self.create_recipe()
+        self.assertFalse(FeedEntry.objects.filter(recipe=recipe).exists())
+        self.assertFalse(Follow.objects.filter(
+            following=self.authors[0], fanout=True
+        ).exists())
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        response = client.get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['results'][0]['id'], recipe.id)
@@ -0,0 +1,34 @@
+from api.ingredient_index import IngredientIndex
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from recipes.models import Ingredient
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class IngredientIndexTest(TestCase):
+    """Индекс видит изменения, сделанные в другом процессе"""
+
+    def setUp(self):
+        Ingredient.objects.create(name='Мука пшеничная', measurement_unit='г')
+        caches['default'].clear()
+
+    def test_other_index_sees_new_ingredient(self):
+        index = IngredientIndex()
+        self.assertEqual(
+            [item['name'] for item in index.search('мук')],
+            ['Мука пшеничная']
+        )
+        Ingredient.objects.create(name='Мука ржаная', measurement_unit='г')
+        # Изменение сделал другой процесс: его LocMem здесь не виден
+        caches['default'].clear()
+        self.assertEqual(
+            [item['name'] for item in index.search('мук')],
+            ['Мука пшеничная', 'Мука ржаная']
+        )
+
+    @override_settings(CACHE_SINGLE_PROCESS=False, UNSHARED_DATA_TTL=0)
+    def test_unshared_index_expires_by_ttl(self):
+        index = IngredientIndex()
+        index.search('мук')
+        Ingredient.objects.create(name='Мука ржаная', measurement_unit='г')
+        self.assertEqual(len(index.search('мук')), 2)
@@ -0,0 +1,46 @@
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+from users.models import User
+
+METRICS_URL = '/api/metrics'
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsAccessTest(TestCase):
+    """Метрики видны только администратору и сборщику с токеном"""
+
+    def test_anonymous(self):
+        response = APIClient().get(METRICS_URL)
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_regular_user(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='user', email='user@example.com', password='password'
+        ))
+        self.assertEqual(client.get(METRICS_URL).status_code, 403)
+
+    def test_wrong_token(self):
+        response = APIClient().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer wrong'
+        )
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_token(self):
+        response = APIClient().get(
+            METRICS_URL, HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+
+    def test_admin(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user(
+            username='admin', email='admin@example.com', password='password',
+            is_staff=True
+        ))
+        self.assertEqual(client.get(METRICS_URL).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='')
+    def test_empty_token_is_not_accepted(self):
+        response = APIClient().get(METRICS_URL, HTTP_AUTHORIZATION='Bearer ')
+        self.assertIn(response.status_code, (401, 403))
@@ -0,0 +1,98 @@
+from api.pantry_index import pantry_index
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from recipes.models import Ingredient, Tag
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+PANTRY_URL = '/api/recipes/pantry/'
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class PantryTest(TransactionTestCase):
+    """
+    Поиск по имеющимся ингредиентам. TransactionTestCase: журнал
+    изменений индекса пишется в transaction.on_commit.
+    """
+
+    def setUp(self):
+        self.authors, self.reader, self.recipes = create_catalog(20)
+        self.ingredients = list(Ingredient.objects.order_by('id'))
+        caches['shared'].clear()
+        pantry_index.built_at = None
+        self.client = APIClient()
+
+    def search(self, ingredients, **params):
+        response = self.client.get(PANTRY_URL, {
+            'ingredients': [ingredient.id for ingredient in ingredients],
+            'limit': 100,
+            **params
+        })
+        self.assertEqual(response.status_code, 200)
+        return [
+            (recipe['id'], recipe['missing_ingredients'])
+            for recipe in response.data['results']
+        ]
+
+    def expected(self, have, recipes=None):
+        """Рецепты каталога с числом недостающих из have ингредиентов"""
+        rows = [
+            (recipe.id, number % 5 + 1 - have)
+            for number, recipe in enumerate(self.recipes)
+            if recipes is None or recipe in recipes
+        ]
+        return sorted(rows, key=lambda row: (max(row[1], 0), -row[0]))
+
+    def test_ranked_by_missing_count(self):
+        found = self.search(self.ingredients[:2])
+        self.assertEqual(
+            found,
+            [(pk, max(missing, 0)) for pk, missing in self.expected(2)]
+        )
+        self.assertEqual(
+            [missing for _, missing in found],
+            sorted(missing for _, missing in found)
+        )
+
+    def test_max_missing(self):
+        found = self.search(self.ingredients[:2], max_missing=1)
+        self.assertEqual(
+            found,
+            [
+                (pk, max(missing, 0)) for pk, missing in self.expected(2)
+                if missing <= 1
+            ]
+        )
+
+    def test_tags_and_cooking_time(self):
+        tag = Tag.objects.get(slug='tag2')
+        found = self.search(
+            self.ingredients[:1], tags=tag.slug, cooking_time=10
+        )
+        recipes = [
+            recipe for recipe in self.recipes
+            if tag in recipe.tags.all() and recipe.cooking_time <= 10
+        ]
+        self.assertTrue(recipes)
+        self.assertEqual(
+            found,
+            [(pk, missing) for pk, missing in self.expected(1, recipes)]
+        )
+
+    def test_edited_recipe_is_found(self):
+        recipe = self.recipes[4]
+        self.search(self.ingredients[:1])
+        built_at = pantry_index.built_at
+        self.client.force_authenticate(recipe.author)
+        response = self.client.patch(f'/api/recipes/{recipe.id}/', {
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 5},
+            ],
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        # Рецепт изменил другой процесс: его LocMem здесь не виден
+        caches['default'].clear()
+        self.assertIn((recipe.id, 0), self.search(self.ingredients[:1]))
+        self.assertEqual(pantry_index.built_at, built_at)
@@ -0,0 +1,37 @@
+from api.similar_index import SimilarRecipesIndex
+from django.core.cache import caches
+from django.test import TransactionTestCase, override_settings
+from recipes.models import Recipe
+
+from .data import create_catalog
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class RecipeIndexJournalTest(TransactionTestCase):
+    """
+    Журнал изменений в общем кэше. TransactionTestCase: изменения
+    записываются в transaction.on_commit.
+    """
+
+    def setUp(self):
+        self.authors, self.reader, self.recipes = create_catalog(20)
+        caches['shared'].clear()
+
+    def test_other_index_applies_recorded_change(self):
+        index = SimilarRecipesIndex()
+        recipe = self.recipes[4]
+        removed = index.similar(recipe.id, 20)[0]
+        built_at = index.built_at
+        Recipe.objects.get(id=removed).delete()
+        # Рецепт удалил другой процесс: его LocMem здесь не виден
+        caches['default'].clear()
+        self.assertNotIn(removed, index.similar(recipe.id, 20))
+        self.assertEqual(index.built_at, built_at)
+
+    @override_settings(CACHE_SINGLE_PROCESS=False, UNSHARED_DATA_TTL=0)
+    def test_unshared_index_is_rebuilt_by_ttl(self):
+        index = SimilarRecipesIndex()
+        recipe = self.recipes[4]
+        removed = index.similar(recipe.id, 20)[0]
+        Recipe.objects.get(id=removed).delete()
+        self.assertNotIn(removed, index.similar(recipe.id, 20))
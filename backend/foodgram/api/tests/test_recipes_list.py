@@ -0,0 +1,94 @@
+from api.pagination import RecipeCursorPagination
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+
+@override_settings(RECIPE_LIST_CACHE_ALIAS=None)
+class RecipesListQueriesTest(TestCase):
+    """Число запросов списка рецептов не зависит от размера страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog()
+
+    def count_queries(self, client, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(captured), response.data['results']
+
+    def assert_constant_queries(self, client, url):
+        small, small_page = self.count_queries(client, f'{url}limit=1')
+        large, large_page = self.count_queries(client, f'{url}limit=50')
+        self.assertEqual(len(small_page), 1)
+        self.assertGreater(len(large_page), 1)
+        self.assertEqual(small, large)
+
+    def test_anonymous(self):
+        self.assert_constant_queries(APIClient(), '/api/recipes/?')
+
+    def test_authenticated(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        self.assert_constant_queries(client, '/api/recipes/?')
+        self.assert_constant_queries(client, '/api/recipes/?is_favorited=1&')
+
+    def test_cursor(self):
+        self.assert_constant_queries(APIClient(), '/api/recipes/?cursor=&')
+
+
+@override_settings(RECIPE_LIST_CACHE_ALIAS=None)
+class RecipesCursorTest(TestCase):
+    """Курсор (pub_date, id) проходит все рецепты без OFFSET и повторов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(15)
+        same_date = cls.recipes[0].pub_date
+        Recipe.objects.filter(
+            id__in=[recipe.id for recipe in cls.recipes[3:9]]
+        ).update(pub_date=same_date)
+
+    def test_walks_all_recipes(self):
+        client = APIClient()
+        expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id'
+        ).values_list('id', flat=True))
+        seen = []
+        url = '/api/recipes/?cursor=&limit=4'
+        while url:
+            with CaptureQueriesContext(connection) as captured:
+                response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                'OFFSET' in query['sql']
+                for query in captured.captured_queries
+            ))
+            seen.extend(recipe['id'] for recipe in response.data['results'])
+            url = response.data['next']
+        self.assertEqual(seen, expected)
+
+    def test_invalid_cursor(self):
+        response = APIClient().get('/api/recipes/?cursor=bad')
+        self.assertEqual(response.status_code, 404)
+
+    def test_cursor_rejects_other_ordering(self):
+        client = APIClient()
+        for params in ('ordering=popular', 'search=Рецепт'):
+            response = client.get(f'/api/recipes/?cursor=&{params}')
+            self.assertEqual(response.status_code, 400)
+        response = client.get('/api/recipes/?ordering=popular&limit=4')
+        self.assertEqual(response.status_code, 200)
+
+    def test_cursor_page_size_is_capped(self):
+        paginator = RecipeCursorPagination()
+        request = Request(RequestFactory().get('/', {'limit': 1000}))
+        self.assertEqual(
+            paginator.get_page_size(request), paginator.max_page_size
+        )
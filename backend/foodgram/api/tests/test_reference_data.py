@@ -0,0 +1,37 @@
+from api.reference_data import tags_data
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from recipes.models import Tag
+from rest_framework.test import APIClient
+
+TAGS_URL = '/api/tags/'
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class ReferenceDataTest(TestCase):
+    """Готовые ответы справочников и их ETag"""
+
+    def setUp(self):
+        self.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        caches['default'].clear()
+        self.client = APIClient()
+
+    def test_tag_edit_changes_etag(self):
+        etag = self.client.get(TAGS_URL)['ETag']
+        self.assertEqual(
+            self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag).status_code,
+            304
+        )
+        # Тег изменил другой процесс: готовый ответ и LocMem этого
+        # процесса остаются прежними, об изменении говорит только версия
+        built = tags_data.version, tags_data.built_at, tags_data.data
+        self.tag.name = 'Обед'
+        self.tag.save()
+        caches['default'].clear()
+        tags_data.version, tags_data.built_at, tags_data.data = built
+        response = self.client.get(TAGS_URL, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'Обед')
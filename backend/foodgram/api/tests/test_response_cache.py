@@ -0,0 +1,73 @@
+from django.core.cache import caches
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from recipes.catalog import catalog_version
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+LIST_URL = '/api/recipes/?limit=10&ordering=popular'
+
+
+@override_settings(CACHE_SINGLE_PROCESS=True)
+class ResponseCacheTest(TransactionTestCase):
+    """
+    Кэш списков и версии в LocMem при развертывании в одном процессе.
+    TransactionTestCase: версии меняются в transaction.on_commit.
+    """
+
+    def setUp(self):
+        self.authors, self.reader, self.recipes = create_catalog(12)
+        for alias in ('shared', 'recipe_lists'):
+            caches[alias].clear()
+
+    def get(self, client, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, len(captured)
+
+    def test_list_is_served_from_cache(self):
+        client = APIClient()
+        first, first_queries = self.get(client, LIST_URL)
+        second, second_queries = self.get(client, LIST_URL)
+        self.assertEqual(second.data, first.data)
+        self.assertGreater(first_queries, 0)
+        self.assertEqual(second_queries, 0)
+
+    def test_favorite_invalidates_popular_list(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        first, _ = self.get(APIClient(), LIST_URL)
+        last = first.data['results'][-1]['id']
+        for _ in range(2):
+            self.assertEqual(
+                client.post(f'/api/recipes/{last}/favorite/').status_code, 201
+            )
+            client.force_authenticate(self.authors[0])
+        second, queries = self.get(APIClient(), LIST_URL)
+        self.assertGreater(queries, 0)
+        self.assertEqual(second.data['results'][0]['id'], last)
+
+    def test_authenticated_etag(self):
+        client = APIClient()
+        client.force_authenticate(self.reader)
+        url = f'/api/recipes/{self.recipes[0].id}/'
+        response, _ = self.get(client, url)
+        self.assertTrue(response.has_header('ETag'))
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+            304
+        )
+
+    def test_author_saves_without_public_changes(self):
+        author = self.authors[0]
+        version = catalog_version()
+        author.set_password('new-password')
+        author.save()
+        author.save(update_fields=['last_login'])
+        self.assertEqual(catalog_version(), version)
+        author.first_name = 'Переименованный'
+        author.save()
+        self.assertNotEqual(catalog_version(), version)
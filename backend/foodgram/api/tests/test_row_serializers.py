@@ -0,0 +1,81 @@
+from api.row_serializers import (INGREDIENT, TAG, USER, recipe_rows,
+                                 recipes_data)
+from api.serializers import (IngredientSerializer, ReadRecipeSerializer,
+                             TagSerializer)
+from api.sparse_fields import requested_fields
+from django.test import RequestFactory, TestCase
+from recipes.models import Ingredient, Recipe, Tag
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from users.models import User
+from users.serializers import UserSerializer
+
+from .data import create_catalog
+
+
+def api_request(**params):
+    return Request(RequestFactory().get('/api/recipes/', params))
+
+
+class RowSerializersParityTest(TestCase):
+    """row_serializers отдают тот же JSON, что и сериализаторы DRF"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(20)
+
+    def assert_same_json(self, expected, actual):
+        renderer = JSONRenderer()
+        self.assertEqual(renderer.render(actual), renderer.render(expected))
+
+    def assert_same_recipes(self, queryset, request, fields=None):
+        self.assert_same_json(
+            ReadRecipeSerializer(
+                queryset, many=True, context={'request': request}
+            ).data,
+            recipes_data(list(recipe_rows(queryset, fields)), request, fields)
+        )
+
+    def test_recipes(self):
+        for reader in (None, self.reader):
+            with self.subTest(reader=reader):
+                self.assert_same_recipes(
+                    Recipe.objects.for_read(reader), api_request()
+                )
+
+    def test_favorites(self):
+        self.assert_same_recipes(
+            Recipe.objects.for_read(self.reader).filter(
+                favorites__user=self.reader
+            ),
+            api_request()
+        )
+
+    def test_sparse_recipes(self):
+        for params in ({'omit': 'ingredients,text'},
+                       {'fields': 'id,name,author,is_favorited'}):
+            with self.subTest(params=params):
+                request = api_request(**params)
+                fields = requested_fields(
+                    request, ReadRecipeSerializer.Meta.fields
+                )
+                self.assert_same_recipes(
+                    Recipe.objects.for_read(self.reader, fields),
+                    request, fields
+                )
+
+    def test_users(self):
+        self.assert_same_json(
+            UserSerializer(User.objects.all(), many=True).data,
+            USER.many(User.objects.all())
+        )
+
+    def test_reference_data(self):
+        self.assert_same_json(
+            IngredientSerializer(Ingredient.objects.all(), many=True).data,
+            INGREDIENT.many(Ingredient.objects.all())
+        )
+        self.assert_same_json(
+            TagSerializer(Tag.objects.all(), many=True).data,
+            TAG.many(Tag.objects.all())
+        )
@@ -0,0 +1,125 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from recipes import search
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_documents
+from rest_framework.test import APIClient
+from users.models import User
+
+from .test_base64_image import PIXEL
+
+SEARCH_URL = '/api/recipes/?limit=50&search='
+
+
+@override_settings(RECIPE_LIST_CACHE_ALIAS=None)
+class RecipeSearchTest(TestCase):
+    """Полнотекстовый поиск по названию, описанию и ингредиентам"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='cook', email='cook@example.com', password='password',
+            first_name='Повар', last_name='Тестовый'
+        )
+        cls.tag = Tag.objects.create(
+            name='Завтрак', color='#E26C2D', slug='breakfast'
+        )
+        cls.ingredients = {
+            name: Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'молоко', 'кефир', 'кинза')
+        }
+        cls.pancakes = cls.create_recipe(
+            'Блины на молоке', 'Тонкие и кружевные', ('мука', 'молоко')
+        )
+        cls.fritters = cls.create_recipe(
+            'Оладьи', 'Пышнее, чем блины', ('мука', 'кефир')
+        )
+        cls.salad = cls.create_recipe(
+            'Салат', 'Летний и свежий', ('кинза',)
+        )
+
+    @classmethod
+    def create_recipe(cls, name, text, ingredients):
+        recipe = Recipe.objects.create(
+            author=cls.author, name=name, text=text, cooking_time=10,
+            image='recipes/images/test.png'
+        )
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient=cls.ingredients[ingredient],
+                amount=100
+            )
+            for ingredient in ingredients
+        )
+        update_search_documents([recipe.id])
+        return recipe
+
+    def search(self, query):
+        response = APIClient().get(SEARCH_URL + query)
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_name_match_ranks_first(self):
+        self.assertEqual(
+            self.search('блины'), [self.pancakes.id, self.fritters.id]
+        )
+
+    def test_ingredient_match(self):
+        self.assertEqual(self.search('кефир'), [self.fritters.id])
+        self.assertEqual(
+            sorted(self.search('мука')),
+            sorted([self.pancakes.id, self.fritters.id])
+        )
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search('сала'), [self.salad.id])
+
+    def test_punctuation_only(self):
+        for query in ('!!!', '%22', '*', '-'):
+            with self.subTest(query=query):
+                self.assertEqual(self.search(query), [])
+
+    def test_created_recipe_document_is_built_once(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with override_settings(MEDIA_ROOT=media_root), mock.patch.object(
+            search, 'write_search_documents',
+            wraps=search.write_search_documents
+        ) as write:
+            response = client.post('/api/recipes/', {
+                'name': 'Сырники',
+                'text': 'Из творога',
+                'cooking_time': 20,
+                'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': self.ingredients['мука'].id, 'amount': 50}
+                ],
+                'image': f'data:image/png;base64,{PIXEL}',
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(write.call_count, 1)
+        self.assertIn(response.data['id'], self.search('мука'))
+
+    def test_updated_recipe_document_is_built_once(self):
+        client = APIClient()
+        client.force_authenticate(self.author)
+        with mock.patch.object(
+            search, 'write_search_documents',
+            wraps=search.write_search_documents
+        ) as write:
+            response = client.patch(f'/api/recipes/{self.salad.id}/', {
+                'name': 'Салат с кефиром',
+                'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': self.ingredients['кефир'].id, 'amount': 50}
+                ],
+            }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(write.call_count, 1)
+        self.assertEqual(self.search('кинза'), [])
+        self.assertIn(self.salad.id, self.search('кефиром'))
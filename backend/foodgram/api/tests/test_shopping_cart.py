@@ -0,0 +1,79 @@
+import csv
+import io
+from collections import Counter
+
+from django.test import TestCase
+from recipes.cart import rebuild_carts
+from recipes.models import (CartIngredient, Ingredient, RecipeIngredient,
+                            ShoppingCart)
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+
+class CartAggregateTest(TestCase):
+    """Сводная корзина меняется вместе с рецептами в корзине"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(10)
+        cls.ingredients = list(Ingredient.objects.order_by('id'))
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+        self.carted = self.recipes[2:5]
+        for recipe in self.carted:
+            self.client.post(f'/api/recipes/{recipe.id}/shopping_cart/')
+
+    def download(self):
+        response = self.client.get(
+            '/api/recipes/download_shopping_cart/?type=csv'
+        )
+        self.assertEqual(response.status_code, 200)
+        rows = list(csv.reader(io.StringIO(
+            b''.join(response.streaming_content).decode()
+        )))
+        return {name: int(amount) for name, _, amount in rows[1:]}
+
+    def expected(self):
+        totals = Counter()
+        for name, amount in RecipeIngredient.objects.filter(
+            recipe__shopping_cart__user=self.reader
+        ).values_list('ingredient__name', 'amount'):
+            totals[name] += amount
+        return dict(totals)
+
+    def test_recipe_edit_keeps_carts_in_sync(self):
+        recipe = self.carted[0]
+        author = APIClient()
+        author.force_authenticate(recipe.author)
+        response = author.patch(f'/api/recipes/{recipe.id}/', {
+            'tags': list(recipe.tags.values_list('id', flat=True)),
+            'ingredients': [
+                {'id': self.ingredients[0].id, 'amount': 7},
+                {'id': self.ingredients[4].id, 'amount': 3},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            rebuild_carts(
+                ShoppingCart, RecipeIngredient, CartIngredient, fix=False
+            ),
+            0
+        )
+        self.assertEqual(self.download(), self.expected())
+
+    def test_deleted_recipe_leaves_carts(self):
+        recipe = self.carted[1]
+        author = APIClient()
+        author.force_authenticate(recipe.author)
+        response = author.delete(f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(
+            rebuild_carts(
+                ShoppingCart, RecipeIngredient, CartIngredient, fix=False
+            ),
+            0
+        )
+        self.assertEqual(self.download(), self.expected())
@@ -0,0 +1,33 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from .data import create_catalog
+
+
+class SparseFieldsTest(TestCase):
+    """Параметры fields и omit в списке рецептов"""
+
+    @classmethod
+    def setUpTestData(cls):
+        create_catalog(3)
+
+    def get(self, query):
+        return APIClient().get(f'/api/recipes/?{query}')
+
+    def test_selected_fields(self):
+        response = self.get('fields=id,name&omit=name')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.data['results'][0]), ['id'])
+
+    def test_unknown_field(self):
+        response = self.get('fields=id,unknown')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+
+    def test_empty_selection(self):
+        for query, param in (('fields=', 'fields'), ('fields=,', 'fields'),
+                             ('fields=id&omit=id', 'omit')):
+            with self.subTest(query=query):
+                response = self.get(query)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(param, response.data)
@@ -0,0 +1,61 @@
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from users.models import Follow
+
+from .data import create_catalog
+
+
+class SubscriptionsRecipesTest(TestCase):
+    """Превью рецептов в подписках считается только для авторов страницы"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors, cls.reader, cls.recipes = create_catalog(10)
+        Follow.objects.create(user=cls.reader, following=cls.authors[1])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def test_ranks_only_page_authors(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(
+                '/api/users/subscriptions/?limit=1&recipes_limit=2'
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 2)
+        [subscription] = response.data['results']
+        self.assertEqual(len(subscription['recipes']), 2)
+        self.assertEqual(subscription['recipes_count'], 5)
+        [ranking] = [
+            query['sql'] for query in captured.captured_queries
+            if 'ROW_NUMBER' in query['sql']
+        ]
+        self.assertIn(f'IN ({subscription["id"]})', ranking)
+
+    def test_recipes_per_author(self):
+        response = self.client.get(
+            '/api/users/subscriptions/?recipes_limit=3'
+        )
+        for subscription in response.data['results']:
+            authored = [
+                recipe.id for recipe in self.recipes
+                if recipe.author_id == subscription['id']
+            ]
+            self.assertEqual(
+                [recipe['id'] for recipe in subscription['recipes']],
+                sorted(authored, reverse=True)[:3]
+            )
+
+    def test_recipes_limit_is_honored(self):
+        with self.settings(SUBSCRIPTION_RECIPES_LIMIT=2):
+            limited = self.client.get('/api/users/subscriptions/')
+            requested = self.client.get(
+                '/api/users/subscriptions/?recipes_limit=4'
+            )
+        for subscription in limited.data['results']:
+            self.assertEqual(len(subscription['recipes']), 2)
+        for subscription in requested.data['results']:
+            self.assertEqual(len(subscription['recipes']), 4)
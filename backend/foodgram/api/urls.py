@@ -1,7 +1,7 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import IngredientViewSet, RecipeViewSet, TagViewSet
+from .views import IngredientViewSet, RecipeViewSet, TagViewSet, metrics
 
 router = DefaultRouter()
 
@@ -11,6 +11,7 @@ router.register('tags', TagViewSet, basename='tags')
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('metrics', metrics, name='metrics'),
     path('auth/', include('users.urls')),
     path('users/', include('users.urls')),
 ]
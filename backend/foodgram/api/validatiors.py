@@ -3,17 +3,23 @@ from rest_framework.serializers import ValidationError
 
 
 def validate_ingredient(ingredients):
+    """Проверяет ингредиенты рецепта и возвращает {id: количество}"""
     if not ingredients:
         raise ValidationError('Это поле обязательно')
-    unique_ingridients_list = []
+    amounts = {}
     for ingredient in ingredients:
         if ingredient.get('amount') is None:
             raise ValidationError('Укажите колличество')
-        if int(ingredient.get('amount')) < 1:
+        try:
+            amount = int(ingredient.get('amount'))
+            ingredient_id = int(ingredient.get('id'))
+        except (TypeError, ValueError):
+            raise ValidationError('Укажите корректные id и колличество')
+        if amount < 1:
             raise ValidationError('Колличество не может быть меньше 1')
-        ingredient_id = ingredient.get('id')
-        if ingredient_id in unique_ingridients_list:
+        if ingredient_id in amounts:
             raise ValidationError('Ингредиенты должны быть разными')
-        unique_ingridients_list.append(ingredient_id)
-        if not Ingredient.objects.filter(id=ingredient_id).exists():
-            raise ValidationError('Такого ингредиента нет в базе')
+        amounts[ingredient_id] = amount
+    if len(Ingredient.objects.in_bulk(list(amounts))) != len(amounts):
+        raise ValidationError('Такого ингредиента нет в базе')
+    return amounts
@@ -1,19 +1,40 @@
-from django.http import HttpResponse
+from functools import partial
+
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from rest_framework import mixins, status, viewsets
-from rest_framework.decorators import action
+from recipes.cart import change_cart
+from recipes.catalog import bump_catalog_version, bump_user_lists_version
+from recipes.counters import change_counter
+from recipes.models import (CartIngredient, Favorite, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action, api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
-from .filters import IngredientFilter, RecipeFilter
-from .pagination import PageLimitPagination
-from .permissions import IsAuthenticatedAuthorOrReadOnly
+from .conditional import conditional_response, recipe_validators
+from .filters import RecipeFilter
+from .ingredient_index import ingredient_index
+from .metrics import export
+from .pagination import FeedPagination, PageLimitPagination, RecipePagination
+from .pantry_index import pantry_index
+from .permissions import IsAdminOrMetricsToken, IsAuthenticatedAuthorOrReadOnly
+from .reference_data import ingredients_data, tags_data
+from .response_cache import cache_key, get_cached, set_cached, with_user_flags
+from .row_serializers import INGREDIENT, recipe_rows, recipes_data
 from .serializers import (CartSerializer, IngredientSerializer,
-                          ReadRecipeSerializer, TagSerializer,
-                          WriteRecipeSerializer)
+                          PantryRecipeSerializer, ReadRecipeSerializer,
+                          TagSerializer, WriteRecipeSerializer)
+from .shopping_cart import SHOPPING_CART_RENDERERS, get_shopping_list
+from .similar_index import similar_index
+from .sparse_fields import requested_fields
+
+SIMILAR_LIMIT = 6
+SIMILAR_MAX_LIMIT = 50
+RECIPES_LIST_BATCH_LIMIT = 100
 
 
 class ListRetrieveViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
@@ -26,17 +47,99 @@ class IngredientViewSet(ListRetrieveViewSet):
     """Вьюсет для модели Ingredient"""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientFilter
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(ingredient_index.search(name))
+        if request.accepted_renderer.format == 'json':
+            return ingredients_data.response(request)
+        return super().list(request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        row = generics.get_object_or_404(
+            INGREDIENT.rows(self.get_queryset()), id=kwargs['pk']
+        )
+        return Response(INGREDIENT(row))
 
 
 class RecipeViewSet(viewsets.ModelViewSet):
     """Вьюсет для создания и редактирования рецептов"""
     queryset = Recipe.objects.all()
-    pagination_class = PageLimitPagination
+    pagination_class = RecipePagination
     filter_backends = [DjangoFilterBackend]
     filter_class = RecipeFilter
     permission_classes = [IsAuthenticatedAuthorOrReadOnly]
+    shared_response = False
+    known_count = None
+
+    def get_queryset(self):
+        if self.request.method in ['GET']:
+            return Recipe.objects.for_read(
+                None if self.shared_response else self.request.user,
+                self.response_fields()
+            )
+        return Recipe.objects.all()
+
+    def response_fields(self):
+        """Поля рецептов в ответе по fields и omit или None - все поля"""
+        serializer_class = (
+            PantryRecipeSerializer if self.action == 'pantry'
+            else ReadRecipeSerializer
+        )
+        return requested_fields(self.request, serializer_class.Meta.fields)
+
+    def list(self, request, *args, **kwargs):
+        fields = self.response_fields()
+        key = cache_key(request) if fields is None or 'id' in fields else None
+        cached = get_cached(key) if key is not None else None
+        if cached is not None:
+            stamp, data = cached
+        else:
+            stamp = self.filter_queryset(self.get_queryset()).last_change()
+        validators = recipe_validators(
+            request, request.get_full_path(), *stamp.values()
+        )
+        return conditional_response(
+            request, validators,
+            lambda: self.list_response(request, key, stamp, cached)
+        )
+
+    def list_response(self, request, key, stamp, cached):
+        self.known_count = stamp['count']
+        if cached is None:
+            self.shared_response = key is not None
+            response = self.rows_list(request)
+            if key is None:
+                return response
+            data = response.data
+            set_cached(key, (stamp, data))
+        else:
+            _, data = cached
+        return Response(with_user_flags(data, request.user))
+
+    def rows_list(self, request):
+        """Страница рецептов из values_list, без экземпляров моделей"""
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.response_fields()
+        page = self.paginate_queryset(recipe_rows(queryset, fields))
+        return self.get_paginated_response(
+            recipes_data(page, request, fields)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        updated_at = generics.get_object_or_404(
+            Recipe.objects.values_list('updated_at', flat=True),
+            id=kwargs['pk']
+        )
+        validators = recipe_validators(
+            request, request.get_full_path(), updated_at,
+            updated_at=updated_at
+        )
+        return conditional_response(
+            request, validators,
+            partial(super().retrieve, request, *args, **kwargs)
+        )
 
     def get_serializer_class(self):
         if self.request.method in ['GET']:
@@ -62,41 +165,118 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def favorite(self, request, pk):
         return create_or_delete_recipes_list(request, pk, Favorite)
 
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def shopping_cart_bulk(self, request):
+        return bulk_recipes_list(request, ShoppingCart)
+
+    @action(
+        methods=['POST', 'DELETE'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-bulk',
+        permission_classes=(IsAuthenticated,)
+    )
+    def favorite_bulk(self, request):
+        return bulk_recipes_list(request, Favorite)
+
+    @action(detail=True, methods=['GET'])
+    def similar(self, request, pk):
+        recipe = get_object_or_404(Recipe, id=pk)
+        try:
+            limit = min(int(request.query_params['limit']), SIMILAR_MAX_LIMIT)
+        except (KeyError, ValueError):
+            limit = SIMILAR_LIMIT
+        ids = similar_index.similar(recipe.id, max(limit, 1))
+        recipes = self.get_queryset().in_bulk(ids)
+        serializer = ReadRecipeSerializer(
+            [recipes[key] for key in ids if key in recipes],
+            many=True,
+            context=self.get_serializer_context()
+        )
+        return Response(serializer.data)
+
+    @action(detail=False, methods=['GET'])
+    def pantry(self, request):
+        try:
+            ingredients = [
+                int(pk) for pk in request.query_params.getlist('ingredients')
+            ]
+            cooking_time, max_missing = (
+                int(request.query_params[name])
+                if request.query_params.get(name) else None
+                for name in ('cooking_time', 'max_missing')
+            )
+        except ValueError:
+            return Response(
+                {'errors': 'Параметры должны быть целыми числами'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if not ingredients:
+            return Response(
+                {'errors': 'Укажите имеющиеся ингредиенты'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tags = request.query_params.getlist('tags')
+        found = pantry_index.search(
+            ingredients,
+            tag_ids=list(Tag.objects.filter(
+                slug__in=tags
+            ).values_list('id', flat=True)) if tags else None,
+            cooking_time=cooking_time,
+            max_missing=max_missing
+        )
+        paginator = PageLimitPagination()
+        page = paginator.paginate_queryset(found, request)
+        missing = {int(pk): int(count) for pk, count in page}
+        recipes = self.get_queryset().in_bulk(list(missing))
+        context = self.get_serializer_context()
+        context['missing'] = missing
+        serializer = PantryRecipeSerializer(
+            [recipes[pk] for pk in missing if pk in recipes],
+            many=True,
+            context=context
+        )
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(
+        detail=False,
+        methods=['GET'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        paginator = FeedPagination()
+        recipes = paginator.paginate_queryset(self.get_queryset(), request)
+        serializer = ReadRecipeSerializer(
+            recipes, many=True, context=self.get_serializer_context()
+        )
+        return paginator.get_paginated_response(serializer.data)
+
     @action(
         detail=False,
         methods=['GET'],
         permission_classes=(IsAuthenticated,)
     )
     def download_shopping_cart(self, request):
-        shopping_dict = {}
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=request.user.shopping_cart.values('recipe')
-        ).select_related('ingredient')
-        for obj in ingredients:
-            ingredient = obj.ingredient.name
-            if ingredient not in shopping_dict:
-                shopping_dict[ingredient] = {
-                    'measurement_unit': obj.ingredient.measurement_unit,
-                    'amount': obj.amount
-                }
-            else:
-                shopping_dict[ingredient]['amount'] += obj.amount
-        shopping_cart = '{username} вот твой список покупок \n'
-        download_cart = shopping_cart.format(username=request.user.username)
-        for ingredient in shopping_dict:
-            download_cart += (
-                f'{ingredient} '
-                f'({shopping_dict[ingredient]["measurement_unit"]}) '
-                f'- {shopping_dict[ingredient]["amount"]}\n'
+        file_type = request.query_params.get('type', 'txt')
+        if file_type not in SHOPPING_CART_RENDERERS:
+            return Response(
+                {'errors': 'Неизвестный формат файла'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-        download_cart += 'foodgram'
-        response = HttpResponse(
-            download_cart,
-            content_type='text/plain;charset=UTF-8',
+        renderer, content_type = SHOPPING_CART_RENDERERS[file_type]
+        response = StreamingHttpResponse(
+            renderer(request.user, get_shopping_list(request.user)),
+            content_type=content_type,
         )
         response['Content-Disposition'] = (
             'attachment;'
-            'filename="shopping_cart.txt"'
+            f'filename="shopping_cart.{file_type}"'
         )
         return response
 
@@ -107,34 +287,165 @@ class TagViewSet(ListRetrieveViewSet):
     serializer_class = TagSerializer
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        if request.accepted_renderer.format == 'json':
+            return tags_data.response(request)
+        return super().list(request, *args, **kwargs)
+
+
+def listed_recipes(model, user, recipe_ids):
+    """Рецепты из recipe_ids с признаком listed - есть ли они в списке"""
+    return Recipe.objects.filter(id__in=recipe_ids).only(
+        'id', 'name', 'image', 'image_processed', 'cooking_time'
+    ).annotate(
+        listed=Exists(model.objects.filter(
+            user=user, recipe=OuterRef('pk')
+        ))
+    )
+
+
+def change_recipes_list_totals(model, user, recipe_ids, sign):
+    """Счетчики рецептов и сводная корзина после изменения списка"""
+    change_counter(Recipe, model, recipe_ids, sign)
+    bump_user_lists_version(user.id)
+    if model is Favorite:
+        bump_catalog_version()
+    if model is ShoppingCart:
+        change_cart(CartIngredient, RecipeIngredient, user.id, recipe_ids,
+                    sign)
+
+
+def recipes_list_ids(model, sql, params):
+    """
+    Выполняет sql над таблицей списка и возвращает id рецептов из
+    RETURNING: ровно те строки, которые изменил этот запрос. RETURNING
+    есть в PostgreSQL и в SQLite начиная с 3.35.
+    """
+    quote = connection.ops.quote_name
+    meta = model._meta
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(
+            table=quote(meta.db_table),
+            user=quote(meta.get_field('user').column),
+            recipe=quote(meta.get_field('recipe').column)
+        ), params)
+        return [pk for pk, in cursor.fetchall()]
+
+
+def add_to_recipes_list(model, user, recipe_ids):
+    """
+    Добавляет рецепты в список одним INSERT ... ON CONFLICT DO NOTHING
+    и возвращает id действительно добавленных. Строки, которые успел
+    вставить параллельный запрос, пропускаются без блокировок, поэтому
+    счетчики и сводная корзина меняются только для новых.
+    """
+    with transaction.atomic(savepoint=False):
+        added = recipes_list_ids(
+            model,
+            'INSERT INTO {table} ({user}, {recipe}) VALUES '
+            + ', '.join(['(%s, %s)'] * len(recipe_ids))
+            + ' ON CONFLICT DO NOTHING RETURNING {recipe}',
+            [value for pk in recipe_ids for value in (user.id, pk)]
+        )
+        if added:
+            change_recipes_list_totals(model, user, added, 1)
+    return added
+
+
+def remove_from_recipes_list(model, user, recipe_ids):
+    """Удаляет рецепты из списка одним DELETE и возвращает id удаленных"""
+    with transaction.atomic(savepoint=False):
+        removed = recipes_list_ids(
+            model,
+            'DELETE FROM {table} WHERE {user} = %s AND {recipe} IN ('
+            + ', '.join(['%s'] * len(recipe_ids))
+            + ') RETURNING {recipe}',
+            [user.id, *recipe_ids]
+        )
+        if removed:
+            change_recipes_list_totals(model, user, removed, -1)
+    return removed
+
 
 def create_or_delete_recipes_list(request, pk, model):
-    """Метод для добавления/удаления в избранное и список покупок"""
-    recipe = get_object_or_404(Recipe, id=pk)
+    """
+    Метод для добавления/удаления в избранное и список покупок.
+    Сам список меняется одним запросом, вторым читается рецепт
+    для ответа (или проверяется, что его нет).
+    """
     if request.method == 'POST':
-        obj, created = model.objects.get_or_create(
-            user=request.user,
-            recipe=recipe
-        )
-        if created:
-            serializer = CartSerializer(recipe)
+        recipe = get_object_or_404(listed_recipes(model, request.user, [pk]))
+        if recipe.listed or not add_to_recipes_list(
+            model, request.user, [recipe.id]
+        ):
             return Response(
-                serializer.data,
-                status=status.HTTP_201_CREATED
+                {'errors': 'Рецепт уже в списке'},
+                status=status.HTTP_400_BAD_REQUEST
             )
+        serializer = CartSerializer(recipe)
         return Response(
-            {'errors': 'Рецепт уже в списке'},
-            status=status.HTTP_400_BAD_REQUEST
+            serializer.data,
+            status=status.HTTP_201_CREATED
         )
-    obj = model.objects.filter(
-        user=request.user,
-        recipe=recipe
-    )
-    if obj:
-        obj.delete()
+    try:
+        pk = int(pk)
+    except ValueError:
+        raise Http404
+    if remove_from_recipes_list(model, request.user, [pk]):
         return Response(
             status=status.HTTP_204_NO_CONTENT
         )
+    get_object_or_404(Recipe, id=pk)
     return Response(
         {'errors': 'Нет рецепта'}, status=status.HTTP_400_BAD_REQUEST
     )
+
+
+def bulk_recipes_list(request, model):
+    """Добавление/удаление нескольких рецептов: {"recipes": [id, ...]}"""
+    recipe_ids = request.data.get('recipes')
+    if (
+        not isinstance(recipe_ids, list)
+        or not 0 < len(recipe_ids) <= RECIPES_LIST_BATCH_LIMIT
+        or not all(isinstance(pk, int) for pk in recipe_ids)
+    ):
+        return Response(
+            {'errors': 'Передайте список от 1 до '
+                       f'{RECIPES_LIST_BATCH_LIMIT} id рецептов'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if request.method == 'POST':
+        recipes = [
+            recipe for recipe in listed_recipes(
+                model, request.user, recipe_ids
+            ) if not recipe.listed
+        ]
+        added = set(add_to_recipes_list(
+            model, request.user, [recipe.id for recipe in recipes]
+        )) if recipes else set()
+        recipes = [recipe for recipe in recipes if recipe.id in added]
+        if not recipes:
+            return Response(
+                {'errors': 'Рецепты уже в списке'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = CartSerializer(recipes, many=True)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED
+        )
+    if remove_from_recipes_list(model, request.user, recipe_ids):
+        return Response(
+            status=status.HTTP_204_NO_CONTENT
+        )
+    return Response(
+        {'errors': 'Нет рецептов'}, status=status.HTTP_400_BAD_REQUEST
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminOrMetricsToken])
+def metrics(request):
+    """Метрики API в формате Prometheus"""
+    content, content_type = export()
+    return HttpResponse(content, content_type=content_type)
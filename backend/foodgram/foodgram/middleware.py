@@ -0,0 +1,127 @@
+import logging
+import time
+from collections import Counter
+
+from api import metrics
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """Число и время SQL-запросов одного запроса к API"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.shapes[sql] += 1
+
+    def repeated(self, threshold):
+        return [
+            (sql, count) for sql, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+def server_timing(name, seconds, description=None):
+    value = f'{name};dur={seconds * 1000:.1f}'
+    if description:
+        value += f';desc="{description}"'
+    return value
+
+
+class SQLTimingMiddleware:
+    """
+    Замеряет SQL, сериализацию и рендер ответа и отдает их
+    в заголовке Server-Timing. Одинаковые запросы, повторенные
+    в рамках одного запроса к API, пишутся в лог: это признак N+1.
+    """
+
+    def __init__(self, get_response):
+        if not settings.SQL_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.SQL_REPEAT_THRESHOLD
+
+    def __call__(self, request):
+        stats = QueryStats()
+        request.sql_timing = timing = {
+            'started': time.perf_counter(), 'stats': stats
+        }
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        finished = time.perf_counter()
+        view_end = timing.get('view_end', finished)
+        view_db = timing.get('view_db', stats.duration)
+        render = finished - view_end - (stats.duration - view_db)
+        repeated = stats.repeated(self.threshold)
+        queries = f'{stats.count} queries'
+        if repeated:
+            queries += f', {len(repeated)} repeated'
+        response['Server-Timing'] = ', '.join((
+            server_timing('db', stats.duration, queries),
+            server_timing('serialize', view_end - timing['started'] - view_db),
+            server_timing('render', render),
+        ))
+        self.report_repeated(request, repeated)
+        return response
+
+    def process_template_response(self, request, response):
+        timing = getattr(request, 'sql_timing', None)
+        if timing is not None:
+            timing['view_end'] = time.perf_counter()
+            timing['view_db'] = timing['stats'].duration
+        return response
+
+    def report_repeated(self, request, repeated):
+        for sql, count in repeated:
+            logger.warning(
+                'Запрос повторен %s раз за %s %s: %s',
+                count, request.method, request.path, sql
+            )
+
+
+class MetricsMiddleware:
+    """
+    Считает запросы, время ответа и число SQL-запросов
+    для каждого действия вьюсета, см. /api/metrics
+    """
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = [0]
+
+        def count_query(execute, sql, params, many, context):
+            queries[0] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count_query):
+            response = self.get_response(request)
+        view = getattr(request, 'metrics_view', 'unmatched')
+        metrics.requests_total.labels(
+            view, request.method, response.status_code
+        ).inc()
+        metrics.request_duration.labels(view).observe(
+            time.perf_counter() - started
+        )
+        metrics.request_queries.labels(view).observe(queries[0])
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.metrics_view = metrics.view_label(view_func, request.method)
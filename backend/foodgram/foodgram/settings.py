@@ -51,6 +51,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'foodgram.middleware.MetricsMiddleware',
+    'foodgram.middleware.SQLTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -116,7 +118,7 @@ AUTH_PASSWORD_VALIDATORS = [
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'users.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -147,3 +149,93 @@ MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 AUTH_USER_MODEL = 'users.User'
+
+SHOPPING_CART_PDF_FONT = os.getenv(
+    'SHOPPING_CART_PDF_FONT',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
+INGREDIENT_INDEX_TTL = int(os.getenv('INGREDIENT_INDEX_TTL', default=300))
+REFERENCE_DATA_TTL = int(os.getenv('REFERENCE_DATA_TTL', default=300))
+
+IMAGE_MAX_BYTES = int(os.getenv('IMAGE_MAX_BYTES', default=5 * 1024 * 1024))
+IMAGE_MAX_PIXELS = int(os.getenv('IMAGE_MAX_PIXELS', default=25_000_000))
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', default=2))
+IMAGE_QUEUE_SIZE = int(os.getenv('IMAGE_QUEUE_SIZE', default=32))
+IMAGE_RENDITIONS = {
+    'card': (480, 480),
+    'detail': (1200, 1200),
+}
+
+SQL_TIMING_ENABLED = os.getenv(
+    'SQL_TIMING_ENABLED', default=str(DEBUG)
+) == 'True'
+SQL_REPEAT_THRESHOLD = int(os.getenv('SQL_REPEAT_THRESHOLD', default=5))
+
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', default='True') == 'True'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', default='')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': os.getenv(
+            'SHARED_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('SHARED_CACHE_LOCATION', default='shared'),
+    },
+    'recipe_lists': {
+        'BACKEND': os.getenv(
+            'RECIPE_LIST_CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv(
+            'RECIPE_LIST_CACHE_LOCATION', default='recipe-lists'
+        ),
+        'TIMEOUT': int(os.getenv('RECIPE_LIST_CACHE_TTL', default=300)),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(
+                os.getenv('RECIPE_LIST_CACHE_MAX_ENTRIES', default=1000)
+            ),
+        },
+    },
+}
+
+RECIPE_LIST_CACHE_ALIAS = os.getenv(
+    'RECIPE_LIST_CACHE_ALIAS', default='recipe_lists'
+)
+
+CACHE_SINGLE_PROCESS = os.getenv(
+    'CACHE_SINGLE_PROCESS', default='False'
+) == 'True'
+VERSION_CACHE_ALIAS = os.getenv('VERSION_CACHE_ALIAS', default='shared')
+UNSHARED_DATA_TTL = int(os.getenv('UNSHARED_DATA_TTL', default=30))
+
+TOKEN_CACHE_ALIAS = os.getenv('TOKEN_CACHE_ALIAS', default='shared')
+TOKEN_CACHE_TTL = int(os.getenv('TOKEN_CACHE_TTL', default=300))
+TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', default=10000))
+
+SUBSCRIPTION_RECIPES_LIMIT = int(
+    os.getenv('SUBSCRIPTION_RECIPES_LIMIT', default=10)
+)
+
+FEED_MERGE_ON_READ_RECIPES = int(
+    os.getenv('FEED_MERGE_ON_READ_RECIPES', default=500)
+)
+FEED_FAN_OUT_FOLLOWERS = int(
+    os.getenv('FEED_FAN_OUT_FOLLOWERS', default=FEED_MERGE_ON_READ_RECIPES)
+)
+
+RECIPE_CHANGES_TTL = int(os.getenv('RECIPE_CHANGES_TTL', default=3600))
+
+SIMILAR_INDEX_TTL = int(os.getenv('SIMILAR_INDEX_TTL', default=3600))
+SIMILAR_INDEX_MAX_CHANGES = int(
+    os.getenv('SIMILAR_INDEX_MAX_CHANGES', default=1000)
+)
+
+PANTRY_INDEX_TTL = int(os.getenv('PANTRY_INDEX_TTL', default=3600))
+PANTRY_INDEX_MAX_CHANGES = int(
+    os.getenv('PANTRY_INDEX_MAX_CHANGES', default=1000)
+)
@@ -0,0 +1,124 @@
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+BATCH_SIZE = 500
+
+
+def batches(items):
+    items = list(items)
+    for start in range(0, len(items), BATCH_SIZE):
+        yield items[start:start + BATCH_SIZE]
+
+
+def recipe_amounts(recipe_ingredient_model, recipe_ids):
+    """{ингредиент: сумма количеств} по рецептам"""
+    return dict(recipe_ingredient_model.objects.filter(
+        recipe_id__in=recipe_ids
+    ).order_by().values('ingredient_id').annotate(
+        total=Sum('amount')
+    ).values_list('ingredient_id', 'total'))
+
+
+def apply_deltas(cart_model, user_ids, deltas):
+    """
+    Прибавляет deltas {ингредиент: количество} к сводным корзинам
+    пользователей: недостающие строки вставляются с нулем, суммы
+    меняются одним UPDATE, обнулившиеся строки удаляются.
+    """
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    change = Case(
+        *[When(ingredient_id=pk, then=Value(delta))
+          for pk, delta in deltas.items()],
+        output_field=IntegerField()
+    )
+    added = [pk for pk, delta in deltas.items() if delta > 0]
+    for users in batches(user_ids):
+        cart_model.objects.bulk_create(
+            [
+                cart_model(user_id=user_id, ingredient_id=pk, amount=0)
+                for user_id in users for pk in added
+            ],
+            ignore_conflicts=True
+        )
+        items = cart_model.objects.filter(
+            user_id__in=users, ingredient_id__in=deltas
+        )
+        items.update(amount=F('amount') + change)
+        if len(added) < len(deltas):
+            items.filter(amount__lte=0).delete()
+
+
+def change_cart(cart_model, recipe_ingredient_model, user_id, recipe_ids,
+                sign):
+    """Добавляет (sign=1) или убирает (sign=-1) рецепты из сводной корзины"""
+    apply_deltas(cart_model, [user_id], {
+        pk: sign * amount for pk, amount in recipe_amounts(
+            recipe_ingredient_model, recipe_ids
+        ).items()
+    })
+
+
+def change_recipe_in_carts(cart_model, list_model, recipe_id, deltas):
+    """Переносит изменение состава рецепта в корзины всех, у кого он есть"""
+    if deltas:
+        apply_deltas(cart_model, list_model.objects.filter(
+            recipe_id=recipe_id
+        ).values_list('user_id', flat=True), deltas)
+
+
+def remove_recipe_from_carts(cart_model, list_model,
+                             recipe_ingredient_model, recipe_id):
+    change_recipe_in_carts(cart_model, list_model, recipe_id, {
+        pk: -amount for pk, amount in recipe_amounts(
+            recipe_ingredient_model, [recipe_id]
+        ).items()
+    })
+
+
+def expected_totals(recipe_ingredient_model, user_ids):
+    rows = recipe_ingredient_model.objects.filter(
+        recipe__shopping_cart__user_id__in=user_ids
+    ).order_by().values(
+        'recipe__shopping_cart__user_id', 'ingredient_id'
+    ).annotate(total=Sum('amount')).values_list(
+        'recipe__shopping_cart__user_id', 'ingredient_id', 'total'
+    )
+    return {(user_id, pk): total for user_id, pk, total in rows}
+
+
+def rebuild_carts(list_model, recipe_ingredient_model, cart_model,
+                  fix=True):
+    """
+    Сверяет сводные корзины с ShoppingCart и, если fix, пересобирает
+    разошедшиеся. Возвращает число пользователей с расхождениями.
+    Принимает модели, чтобы работать и с историческими моделями миграций.
+    """
+    user_ids = set(list_model.objects.values_list('user_id', flat=True))
+    user_ids.update(cart_model.objects.values_list('user_id', flat=True))
+    drifted = 0
+    for users in batches(sorted(user_ids)):
+        expected = expected_totals(recipe_ingredient_model, users)
+        stored = {
+            (user_id, pk): amount
+            for user_id, pk, amount in cart_model.objects.filter(
+                user_id__in=users
+            ).values_list('user_id', 'ingredient_id', 'amount')
+        }
+        wrong = {
+            key[0] for key in expected.keys() | stored.keys()
+            if expected.get(key) != stored.get(key)
+        }
+        drifted += len(wrong)
+        if fix and wrong:
+            cart_model.objects.filter(user_id__in=wrong).delete()
+            cart_model.objects.bulk_create(
+                [
+                    cart_model(user_id=user_id, ingredient_id=pk,
+                               amount=total)
+                    for (user_id, pk), total in expected.items()
+                    if user_id in wrong
+                ],
+                batch_size=BATCH_SIZE
+            )
+    return drifted
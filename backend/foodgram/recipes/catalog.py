@@ -0,0 +1,105 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.utils import timezone
+
+VERSION_CACHE_KEY = 'catalog_version'
+
+
+def shared_cache(alias):
+    """
+    Кэш alias, если он общий для всех процессов (Redis, Memcached,
+    база), иначе None: запись в LocMem видит только один процесс.
+    При CACHE_SINGLE_PROCESS (runserver, gunicorn с одним воркером)
+    LocMem тоже годится: других процессов нет.
+    """
+    if not alias:
+        return None
+    shared = caches[alias]
+    if isinstance(shared, DummyCache) or isinstance(
+        shared, LocMemCache
+    ) and not settings.CACHE_SINGLE_PROCESS:
+        return None
+    return shared
+
+
+def current_version(shared, key):
+    """
+    Версия из общего кэша. Пропавшая (вытеснена, кэш перезапущен)
+    заменяется новой, а не None: иначе она совпала бы с версией,
+    под которой клиент получил ETag до первого изменения.
+    """
+    version = shared.get(key)
+    if version is None:
+        shared.add(key, uuid.uuid4().hex, None)
+        version = shared.get(key)
+    return version
+
+
+def local_data_ttl(ttl, shared):
+    """
+    Время жизни данных в памяти процесса. Без общего кэша версий
+    (shared is None) изменения из других процессов не видны до
+    перестроения, поэтому ttl сокращается до UNSHARED_DATA_TTL.
+    """
+    if shared is None:
+        return min(ttl, settings.UNSHARED_DATA_TTL)
+    return ttl
+
+
+def catalog_version():
+    """
+    Версия каталога или None, если нет общего кэша VERSION_CACHE_ALIAS:
+    тогда ответы не кэшируются, потому что смену версии в одном
+    процессе не увидят остальные.
+    """
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is None:
+        return None
+    return current_version(shared, VERSION_CACHE_KEY)
+
+
+def bump_catalog_version():
+    """
+    Меняет версию каталога после коммита: закэшированные ответы
+    со старой версией в ключе больше не используются, перебирать
+    и удалять ключи не нужно.
+    """
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is not None:
+        transaction.on_commit(
+            lambda: shared.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        )
+
+
+def user_lists_version(user_id):
+    """
+    Версия избранного, корзины и подписок пользователя или None, если
+    нет общего кэша VERSION_CACHE_ALIAS: версию в памяти одного процесса
+    остальные процессы не увидят и будут отвечать 304 на старый ETag.
+    """
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is None:
+        return None
+    return current_version(shared, f'user_lists_version:{user_id}')
+
+
+def bump_user_lists_version(user_id):
+    """
+    Меняет версию избранного, корзины и подписок пользователя: от них
+    зависят флаги в выдаче, но не время изменения рецептов.
+    """
+    shared = shared_cache(settings.VERSION_CACHE_ALIAS)
+    if shared is not None:
+        transaction.on_commit(lambda: shared.set(
+            f'user_lists_version:{user_id}', uuid.uuid4().hex, None
+        ))
+
+
+def touch_recipes(recipes):
+    """Отмечает рецепты измененными без сохранения и сигналов модели"""
+    recipes.update(updated_at=timezone.now())
@@ -0,0 +1,45 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+COUNTER_FIELDS = {
+    'favorite': 'favorites_count',
+    'shoppingcart': 'in_carts_count',
+}
+
+
+def change_counter(recipe_model, list_model, recipe_ids, delta):
+    """Атомарно меняет счетчик рецептов для Favorite/ShoppingCart"""
+    field = COUNTER_FIELDS[list_model._meta.model_name]
+    recipe_model.objects.filter(id__in=recipe_ids).update(
+        **{field: F(field) + delta}
+    )
+
+
+def actual_count(list_model):
+    return Coalesce(
+        Subquery(
+            list_model.objects.filter(
+                recipe=OuterRef('pk')
+            ).order_by().values('recipe').annotate(
+                total=Count('id')
+            ).values('total'),
+            output_field=IntegerField()
+        ),
+        0
+    )
+
+
+def recount_counters(recipe_model, *list_models):
+    """
+    Пересчитывает счетчики одним UPDATE на каждый список.
+    Возвращает {поле: число рецептов, где счетчик разошелся}.
+    """
+    drift = {}
+    for list_model in list_models:
+        field = COUNTER_FIELDS[list_model._meta.model_name]
+        drift[field] = recipe_model.objects.annotate(
+            actual=actual_count(list_model)
+        ).exclude(**{field: F('actual')}).count()
+        if drift[field]:
+            recipe_model.objects.update(**{field: actual_count(list_model)})
+    return drift
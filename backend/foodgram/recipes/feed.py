@@ -0,0 +1,126 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db.models import Q
+
+BATCH_SIZE = 5000
+
+
+def insert(feed_model, entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            break
+        feed_model.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def is_prolific(recipe_model, author_id):
+    """
+    У автора не меньше FEED_MERGE_ON_READ_RECIPES рецептов:
+    его рецепты не раскладываются по лентам, а подмешиваются при чтении
+    """
+    limit = settings.FEED_MERGE_ON_READ_RECIPES
+    return recipe_model.objects.filter(
+        author_id=author_id
+    ).order_by().values('id')[limit - 1:limit].exists()
+
+
+def fan_out(feed_model, follow_model, recipe):
+    """
+    Раскладывает новый рецепт по лентам подписчиков автора. Вставка
+    идет в запросе, создающем рецепт, поэтому больше
+    FEED_FAN_OUT_FOLLOWERS лент не пишем: подписки на такого автора
+    переводятся на подмешивание при чтении одним UPDATE.
+    """
+    followers = follow_model.objects.filter(
+        following_id=recipe.author_id, fanout=True
+    )
+    limit = settings.FEED_FAN_OUT_FOLLOWERS
+    user_ids = list(followers.order_by().values_list(
+        'user_id', flat=True
+    )[:limit + 1])
+    if len(user_ids) > limit:
+        followers.update(fanout=False)
+        return
+    insert(feed_model, (
+        feed_model(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+        for user_id in user_ids
+    ))
+    if is_prolific(type(recipe), recipe.author_id):
+        followers.update(fanout=False)
+
+
+def fill_timeline(feed_model, recipe_model, follow):
+    """Добавляет в ленту подписчика рецепты автора, на которого он
+    подписался, или переводит подписку на подмешивание при чтении"""
+    if is_prolific(recipe_model, follow.following_id):
+        type(follow).objects.filter(id=follow.id).update(fanout=False)
+        return
+    recipes = recipe_model.objects.filter(
+        author_id=follow.following_id
+    ).values_list('id', 'pub_date')
+    insert(feed_model, (
+        feed_model(user_id=follow.user_id, recipe_id=pk, pub_date=pub_date)
+        for pk, pub_date in recipes.iterator()
+    ))
+
+
+def clear_timeline(feed_model, follow):
+    feed_model.objects.filter(
+        user_id=follow.user_id, recipe__author_id=follow.following_id
+    ).delete()
+
+
+def rebuild_feeds(recipe_model, follow_model, feed_model):
+    """Заново строит ленты всех пользователей"""
+    feed_model.objects.all().delete()
+    follow_model.objects.update(fanout=True)
+    authors = follow_model.objects.values_list(
+        'following_id', flat=True
+    ).distinct()
+    for author_id in list(authors):
+        follows = follow_model.objects.filter(following_id=author_id)
+        if is_prolific(recipe_model, author_id):
+            follows.update(fanout=False)
+            continue
+        recipes = list(recipe_model.objects.filter(
+            author_id=author_id
+        ).values_list('id', 'pub_date'))
+        insert(feed_model, (
+            feed_model(user_id=user_id, recipe_id=pk, pub_date=pub_date)
+            for user_id in follows.values_list('user_id', flat=True)
+            for pk, pub_date in recipes
+        ))
+
+
+def after(position, date_field, id_field):
+    """Условие "строго после позиции" для сортировки по убыванию"""
+    pub_date, pk = position
+    return Q(**{f'{date_field}__lt': pub_date}) | Q(**{
+        date_field: pub_date, f'{id_field}__lt': pk
+    })
+
+
+def feed_page(feed_model, follow_model, recipe_model, user, position, size):
+    """
+    Ключи (pub_date, id) следующих size + 1 рецептов ленты user после
+    position: из готовой ленты и из рецептов плодовитых авторов
+    """
+    entries = feed_model.objects.filter(user=user)
+    if position is not None:
+        entries = entries.filter(after(position, 'pub_date', 'recipe_id'))
+    keys = set(entries.order_by('-pub_date', '-recipe_id').values_list(
+        'pub_date', 'recipe_id'
+    )[:size + 1])
+    merged_authors = list(follow_model.objects.filter(
+        user=user, fanout=False
+    ).values_list('following_id', flat=True))
+    if merged_authors:
+        recipes = recipe_model.objects.filter(author_id__in=merged_authors)
+        if position is not None:
+            recipes = recipes.filter(after(position, 'pub_date', 'id'))
+        keys.update(recipes.order_by('-pub_date', '-id').values_list(
+            'pub_date', 'id'
+        )[:size + 1])
+    return sorted(keys, reverse=True)[:size + 1]
@@ -0,0 +1,110 @@
+import io
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image
+
+from .catalog import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+RENDITION_FORMATS = {
+    'jpg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+}
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_WORKERS,
+    thread_name_prefix='recipe-images'
+)
+pending = threading.BoundedSemaphore(settings.IMAGE_QUEUE_SIZE)
+
+
+def rendition_name(image_name, size, extension):
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, 'renditions', f'{stem}_{size}.{extension}')
+
+
+def rendition_names(image_name):
+    """{'card': ..., 'card_webp': ..., 'detail': ..., ...} для картинки"""
+    names = {}
+    for size in settings.IMAGE_RENDITIONS:
+        for extension in RENDITION_FORMATS:
+            key = size if extension == 'jpg' else f'{size}_{extension}'
+            names[key] = rendition_name(image_name, size, extension)
+    return names
+
+
+def save_rendition(image, name, extension):
+    image_format, options = RENDITION_FORMATS[extension]
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, image_format, **options)
+    if default_storage.exists(name):
+        default_storage.delete(name)
+    default_storage.save(name, ContentFile(buffer.getvalue()))
+
+
+def create_renditions(image_name):
+    with default_storage.open(image_name) as file:
+        original = Image.open(file)
+        original.load()
+    if original.mode not in ('RGB', 'RGBA'):
+        original = original.convert('RGBA')
+    for size, box in settings.IMAGE_RENDITIONS.items():
+        image = original.copy()
+        image.thumbnail(box, Image.LANCZOS)
+        for extension in RENDITION_FORMATS:
+            save_rendition(
+                image, rendition_name(image_name, size, extension), extension
+            )
+
+
+def process_recipe_image(recipe_id, image_name):
+    """Создает уменьшенные копии и отмечает рецепт обработанным"""
+    from .models import Recipe
+    close_old_connections()
+    try:
+        create_renditions(image_name)
+        if Recipe.objects.filter(id=recipe_id, image=image_name).update(
+            image_processed=True, updated_at=timezone.now()
+        ):
+            bump_catalog_version()
+    except Exception:
+        logger.exception('Не удалось обработать картинку %s', image_name)
+    finally:
+        close_old_connections()
+
+
+def run_in_pool(recipe_id, image_name):
+    try:
+        process_recipe_image(recipe_id, image_name)
+    finally:
+        pending.release()
+
+
+def submit(recipe_id, image_name):
+    if not pending.acquire(blocking=False):
+        logger.warning(
+            'Очередь обработки картинок заполнена, %s отложена до '
+            'запуска process_images', image_name
+        )
+        return
+    executor.submit(run_in_pool, recipe_id, image_name)
+
+
+def schedule_renditions(recipe):
+    """Ставит обработку картинки рецепта в пул после коммита транзакции"""
+    recipe_id, image_name = recipe.id, recipe.image.name
+    transaction.on_commit(lambda: submit(recipe_id, image_name))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from recipes.cart import rebuild_carts
+from recipes.models import CartIngredient, RecipeIngredient, ShoppingCart
+
+
+class Command(BaseCommand):
+    """
+    Сверяем сводные корзины CartIngredient с ShoppingCart
+    и пересобираем корзины, которые разошлись
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только проверить, ничего не исправляя'
+        )
+
+    def handle(self, *args, **options):
+        drifted = rebuild_carts(
+            ShoppingCart, RecipeIngredient, CartIngredient,
+            fix=not options['dry_run']
+        )
+        if options['dry_run']:
+            print(f'Корзин с расхождениями - {drifted}')
+        else:
+            print(f'Пересобрано корзин - {drifted}')
@@ -1,26 +1,153 @@
 import csv
+import json
+import os
+import time
+from itertools import islice
 
-from django.core.management.base import BaseCommand
+from api.ingredient_index import invalidate
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from recipes.models import Ingredient
 
+DATA_DIR = os.path.join(settings.BASE_DIR, '..', '..', 'data')
+READ_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    """Строки name,measurement_unit; на короткой - CommandError с ее номером"""
+    reader = csv.reader(file)
+    for row in reader:
+        if not row:
+            continue
+        if len(row) < 2:
+            raise CommandError(
+                f'Строка {reader.line_num}: нужны название и единица '
+                'измерения'
+            )
+        yield row[0], row[1]
+
+
+def decode_item(decoder, buffer, offset, more):
+    """
+    (name, measurement_unit) и длина первого ингредиента в buffer или
+    None, если он не поместился в buffer и файл можно дочитать
+    """
+    try:
+        item, end = decoder.raw_decode(buffer)
+    except json.JSONDecodeError as error:
+        if more:
+            return None
+        raise CommandError(f'Символ {offset + error.pos}: {error.msg}')
+    try:
+        return (item['name'], item['measurement_unit']), end
+    except (KeyError, TypeError):
+        raise CommandError(
+            f'Символ {offset}: у ингредиента должны быть '
+            'name и measurement_unit'
+        )
+
+
+def read_json(file):
+    """
+    Читает JSON-массив по частям, не загружая файл целиком.
+    На некорректных данных - CommandError с номером символа в файле.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    offset = 0
+    started = finished = False
+    while not finished:
+        chunk = file.read(READ_SIZE)
+        buffer += chunk
+        while True:
+            stripped = buffer.lstrip(' \t\r\n,')
+            offset += len(buffer) - len(stripped)
+            buffer = stripped
+            if not buffer:
+                break
+            if not started:
+                if buffer[0] != '[':
+                    raise CommandError(
+                        f'Символ {offset}: ожидается JSON-массив ингредиентов'
+                    )
+                buffer = buffer[1:]
+                offset += 1
+                started = True
+                continue
+            if buffer[0] == ']':
+                finished = True
+                break
+            decoded = decode_item(decoder, buffer, offset, bool(chunk))
+            if decoded is None:
+                break
+            row, end = decoded
+            buffer = buffer[end:]
+            offset += end
+            yield row
+        if not chunk and not finished:
+            raise CommandError(
+                f'Символ {offset}: файл закончился до конца JSON-массива'
+            )
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
+
 
 class Command(BaseCommand):
     """
-    Загружаем ингредиенты в базу из csv файла,
-    который располагается в директории /data/
+    Загружаем ингредиенты в базу из csv или json файла,
+    по умолчанию - из директории /data/.
+    Повторная загрузка не создает дубликатов, файл с ошибкой
+    не загружается частично.
     """
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'file',
+            nargs='?',
+            default=os.path.join(DATA_DIR, 'ingredients.csv'),
+            help='Путь к ingredients.csv или ingredients.json'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Сколько строк вставлять за один запрос'
+        )
+
     def handle(self, *args, **options):
-        self.import_ingredients()
+        self.import_ingredients(options['file'], options['chunk_size'])
         print('Загрузка ингредиентов завершена.')
 
-    def import_ingredients(self, file='ingredients.csv'):
-        print(f'Загрузка {file}...')
-        file_path = f'../../data/{file}'
-        with open(file_path, newline='', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row in reader:
-                status, created = Ingredient.objects.update_or_create(
-                    name=row[0],
-                    measurement_unit=row[1]
+    def import_ingredients(self, file_path, chunk_size):
+        reader = READERS.get(os.path.splitext(file_path)[1].lower())
+        if reader is None:
+            raise CommandError('Поддерживаются только файлы .csv и .json')
+        print(f'Загрузка {file_path}...')
+        started = time.monotonic()
+        total = 0
+        with open(file_path, newline='', encoding='utf-8') as f, \
+                transaction.atomic():
+            rows = reader(f)
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                Ingredient.objects.bulk_create(
+                    (
+                        Ingredient(name=name, measurement_unit=unit)
+                        for name, unit in chunk
+                    ),
+                    ignore_conflicts=True
+                )
+                total += len(chunk)
+                elapsed = max(time.monotonic() - started, 0.001)
+                print(
+                    f'Обработано строк: {total} '
+                    f'({total / elapsed:.0f} строк/с)'
                 )
+        invalidate()
@@ -0,0 +1,285 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image
+from recipes.cart import rebuild_carts
+from recipes.counters import recount_counters
+from recipes.feed import rebuild_feeds
+from recipes.models import (CartIngredient, Favorite, FeedEntry, Ingredient,
+                            Recipe, RecipeIngredient, ShoppingCart, Tag)
+from recipes.search import join_document, write_fts_rows
+from users.models import Follow, User
+
+IMAGE_NAME = 'recipes/images/generated.png'
+EPOCH = datetime(2022, 1, 1, tzinfo=timezone.utc)
+TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#D2A575', 'dessert'),
+    ('Выпечка', '#75B9D2', 'bakery'),
+)
+WORDS = (
+    'нарезать', 'обжарить', 'смешать', 'добавить', 'запечь', 'посолить',
+    'поперчить', 'варить', 'минут', 'до', 'готовности', 'на', 'среднем',
+    'огне', 'подавать', 'горячим', 'украсить', 'зеленью', 'остудить',
+)
+DISHES = (
+    'Суп', 'Салат', 'Рагу', 'Пирог', 'Каша', 'Запеканка', 'Паста',
+    'Омлет', 'Плов', 'Котлеты', 'Блины', 'Соус',
+)
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для random.choices"""
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(size)))
+
+
+def sample_unique(rng, population, cum_weights, count):
+    """count разных элементов с вероятностями по весам"""
+    count = min(count, len(population))
+    chosen = set()
+    while len(chosen) < count:
+        chosen.update(rng.choices(
+            population, cum_weights=cum_weights, k=count - len(chosen)
+        ))
+    return sorted(chosen)
+
+
+@contextmanager
+def manual_dates():
+    """Позволяет задать pub_date и updated_at вручную при bulk_create"""
+    fields = [
+        (Recipe._meta.get_field('pub_date'), 'auto_now_add'),
+        (Recipe._meta.get_field('updated_at'), 'auto_now'),
+    ]
+    for field, option in fields:
+        setattr(field, option, False)
+    try:
+        yield
+    finally:
+        for field, option in fields:
+            setattr(field, option, True)
+
+
+class Command(BaseCommand):
+    """
+    Генерируем большую базу для поиска проблем с производительностью:
+    пользователей, рецепты, подписки, избранное и списки покупок.
+    Одинаковый seed дает одинаковые данные.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument(
+            '--recipes', type=int, default=10000,
+            help='Общее число рецептов'
+        )
+        parser.add_argument(
+            '--follows', type=int, default=20,
+            help='Среднее число подписок пользователя'
+        )
+        parser.add_argument(
+            '--favorites', type=int, default=30,
+            help='Среднее число рецептов в избранном пользователя'
+        )
+        parser.add_argument(
+            '--cart', type=int, default=5,
+            help='Среднее число рецептов в списке покупок пользователя'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.prefix = f'gen{options["seed"]}_'
+        if User.objects.filter(username__startswith=self.prefix).exists():
+            raise CommandError(
+                f'Данные с seed={options["seed"]} уже сгенерированы'
+            )
+        self.ingredients = list(
+            Ingredient.objects.values_list('id', 'name')
+        )
+        if not self.ingredients:
+            raise CommandError('Сначала загрузите ингредиенты: filling_db')
+        self.started = time.monotonic()
+        self.create_image()
+        tags = self.create_tags()
+        users = self.create_users(options['users'])
+        recipes = self.create_recipes(users, tags, options['recipes'])
+        self.create_follows(users, options['follows'])
+        self.create_lists(Favorite, users, recipes, options['favorites'])
+        self.create_lists(ShoppingCart, users, recipes, options['cart'])
+        recount_counters(Recipe, Favorite, ShoppingCart)
+        rebuild_feeds(Recipe, Follow, FeedEntry)
+        rebuild_carts(ShoppingCart, RecipeIngredient, CartIngredient)
+        self.report(f'FeedEntry: {FeedEntry.objects.count()}')
+        self.report('Генерация завершена')
+
+    def report(self, message):
+        elapsed = time.monotonic() - self.started
+        print(f'[{elapsed:7.1f} с] {message}')
+
+    def insert(self, model, objects, report=True):
+        """Вставляет объекты из итератора пачками по batch_size"""
+        objects = iter(objects)
+        total = 0
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    batch, ignore_conflicts=model is not Recipe
+                )
+            total += len(batch)
+        if report:
+            self.report(f'{model.__name__}: {total}')
+        return total
+
+    def new_ids(self, model, last_id):
+        return list(
+            model.objects.filter(id__gt=last_id).order_by('id').values_list(
+                'id', flat=True
+            )
+        )
+
+    def last_id(self, model):
+        last = model.objects.order_by('-id').values_list('id', flat=True)
+        return last.first() or 0
+
+    def create_image(self):
+        if default_storage.exists(IMAGE_NAME):
+            return
+        buffer = io.BytesIO()
+        Image.new('RGB', (600, 400), (226, 108, 45)).save(buffer, 'PNG')
+        default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color}
+            )
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        last_id = self.last_id(User)
+        password = make_password('generated-password')
+        self.insert(User, (
+            User(
+                username=f'{self.prefix}{number}',
+                email=f'{self.prefix}{number}@example.org',
+                first_name=f'Имя{number}',
+                last_name=f'Фамилия{number}',
+                password=password
+            )
+            for number in range(count)
+        ))
+        return self.new_ids(User, last_id)
+
+    def create_recipes(self, users, tags, count):
+        author_weights = zipf_weights(len(users), 1.1)
+        ingredient_weights = zipf_weights(len(self.ingredients), 0.8)
+        ids = []
+        with manual_dates():
+            for start in range(0, count, self.batch_size):
+                ids.extend(self.create_recipe_batch(
+                    self.rng.choices(
+                        users,
+                        cum_weights=author_weights,
+                        k=min(self.batch_size, count - start)
+                    ),
+                    tags,
+                    ingredient_weights
+                ))
+        self.report(f'Recipe: {len(ids)}')
+        return ids
+
+    def create_recipe_batch(self, authors, tags, ingredient_weights):
+        rng = self.rng
+        recipes, compositions = [], []
+        for author_id in authors:
+            composition = sample_unique(
+                rng, self.ingredients, ingredient_weights,
+                max(1, int(rng.gauss(8, 3)))
+            )
+            names = [name for _, name in composition]
+            name = f'{rng.choice(DISHES)} {rng.choice(names)}'[:200]
+            text = ' '.join(rng.choices(WORDS, k=rng.randint(10, 80)))
+            cooking_time = rng.randint(5, 180)
+            pub_date = EPOCH - timedelta(seconds=rng.randint(0, 3 * 10**7))
+            document = (name, text, ' '.join(names))
+            recipes.append(Recipe(
+                author_id=author_id,
+                name=name,
+                image=IMAGE_NAME,
+                text=text,
+                cooking_time=cooking_time,
+                pub_date=pub_date,
+                updated_at=pub_date,
+                search_document=join_document(document)
+            ))
+            compositions.append((composition, document))
+        last_id = self.last_id(Recipe)
+        self.insert(Recipe, recipes, report=False)
+        ids = self.new_ids(Recipe, last_id)
+        self.insert(RecipeIngredient, (
+            RecipeIngredient(
+                recipe_id=recipe_id,
+                ingredient_id=ingredient_id,
+                amount=rng.randint(1, 500)
+            )
+            for recipe_id, (composition, _) in zip(ids, compositions)
+            for ingredient_id, _ in composition
+        ), report=False)
+        through = Recipe.tags.through
+        self.insert(through, (
+            through(recipe_id=recipe_id, tag_id=tag_id)
+            for recipe_id in ids
+            for tag_id in rng.sample(tags, rng.randint(1, min(3, len(tags))))
+        ), report=False)
+        write_fts_rows({
+            recipe_id: document
+            for recipe_id, (_, document) in zip(ids, compositions)
+        })
+        return ids
+
+    def create_follows(self, users, average):
+        weights = zipf_weights(len(users), 1.0)
+        authors = list(users)
+        self.rng.shuffle(authors)
+        self.insert(Follow, (
+            Follow(user_id=user_id, following_id=author_id)
+            for user_id in users
+            for author_id in sample_unique(
+                self.rng, authors, weights, self.random_count(average)
+            )
+            if author_id != user_id
+        ))
+
+    def random_count(self, average):
+        """Экспоненциальное распределение: мало активных, много пассивных"""
+        return int(self.rng.expovariate(1 / average)) if average else 0
+
+    def create_lists(self, model, users, recipes, average):
+        weights = zipf_weights(len(recipes), 0.9)
+        popular = list(recipes)
+        self.rng.shuffle(popular)
+        self.insert(model, (
+            model(user_id=user_id, recipe_id=recipe_id)
+            for user_id in users
+            for recipe_id in sample_unique(
+                self.rng, popular, weights, self.random_count(average)
+            )
+        ))
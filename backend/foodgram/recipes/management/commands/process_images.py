@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    """
+    Создаем уменьшенные копии картинок рецептов,
+    которые не успели обработаться в фоне
+    """
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.filter(
+            image_processed=False
+        ).values_list('id', 'image')
+        for recipe_id, image_name in recipes.iterator():
+            process_recipe_image(recipe_id, image_name)
+        print('Обработка картинок завершена.')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from recipes.catalog import bump_catalog_version
+from recipes.counters import recount_counters
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+class Command(BaseCommand):
+    """
+    Пересчитываем счетчики избранного и корзины у рецептов,
+    если они разошлись с таблицами Favorite и ShoppingCart
+    """
+
+    def handle(self, *args, **options):
+        drift = recount_counters(Recipe, Favorite, ShoppingCart)
+        if drift['favorites_count']:
+            bump_catalog_version()
+        for field, count in drift.items():
+            print(f'{field}: исправлено рецептов - {count}')
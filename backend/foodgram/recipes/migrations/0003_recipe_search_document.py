@@ -0,0 +1,50 @@
+# Generated by Django 2.2.20 on 2026-10-18 03:37
+
+from django.db import migrations, models
+
+from recipes.search import (FTS_TABLE, SEARCH_CONFIG, build_search_documents,
+                            write_search_documents)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX recipes_recipe_search_gin ON recipes_recipe '
+            f"USING gin (to_tsvector('{SEARCH_CONFIG}'::regconfig, "
+            "COALESCE(search_document, '')))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {FTS_TABLE} '
+            'USING fts5(name, text, ingredients)'
+        )
+    Recipe = apps.get_model('recipes', 'Recipe')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    write_search_documents(Recipe, build_search_documents(
+        Recipe.objects.all(), RecipeIngredient.objects.all()
+    ))
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX recipes_recipe_search_gin')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_auto_20221016_1305'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Документ для поиска'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
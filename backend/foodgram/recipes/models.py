@@ -1,6 +1,8 @@
 from django.core.validators import MinValueValidator
 from django.db import models
-from users.models import User
+from django.db.models import (BooleanField, Count, Exists, Max, OuterRef,
+                              Prefetch, Sum, Value)
+from users.models import Follow, User
 
 
 class Ingredient(models.Model):
@@ -19,6 +21,12 @@ class Ingredient(models.Model):
 
     class Meta:
         ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['name', 'measurement_unit'],
+                name='unique_ingredient'
+            ),
+        ]
 
 
 class Tag(models.Model):
@@ -46,6 +54,89 @@ class Tag(models.Model):
         ordering = ['name']
 
 
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов для чтения через API"""
+
+    def with_user_flags(self, user):
+        """Флаги избранного, корзины и подписки на автора для user"""
+        if user is None or user.is_anonymous:
+            false = Value(False, output_field=BooleanField())
+            return self.annotate(
+                favorited=false,
+                in_shopping_cart=false,
+                author_subscribed=false
+            )
+        return self.annotate(
+            favorited=Exists(Favorite.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            )),
+            in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user,
+                recipe=OuterRef('pk')
+            )),
+            author_subscribed=Exists(Follow.objects.filter(
+                user=user,
+                following=OuterRef('author')
+            ))
+        )
+
+    def for_read(self, user, fields=None):
+        """
+        Все данные для ReadRecipeSerializer за фиксированное число
+        запросов, независимо от размера страницы. Если в ответе нужны
+        не все поля, fields - их имена: для остальных не делаются
+        prefetch и аннотации, а описание рецепта не загружается.
+        """
+        def wanted(*names):
+            return fields is None or not fields.isdisjoint(names)
+
+        queryset = self
+        if wanted('author'):
+            queryset = queryset.select_related('author')
+        if wanted('tags'):
+            queryset = queryset.prefetch_related('tags')
+        if wanted('ingredients'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'recipe_ingredient',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            ))
+        if not wanted('text'):
+            queryset = queryset.defer('text')
+        if wanted('is_favorited', 'is_in_shopping_cart', 'author'):
+            queryset = queryset.with_user_flags(user)
+        return queryset
+
+    def count(self):
+        """Аннотации не меняют число строк, поэтому считаем без них:
+        иначе Django группирует по всем подзапросам аннотаций"""
+        if self._result_cache is not None or any(
+            annotation.contains_aggregate
+            for annotation in self.query.annotations.values()
+        ):
+            return super().count()
+        query = self.query.chain()
+        query.annotations.clear()
+        query.set_annotation_mask(None)
+        return query.get_count(using=self.db)
+
+    def last_change(self):
+        """
+        Число рецептов выборки, время последнего изменения и сумма
+        счетчиков избранного: меняются при добавлении, удалении и правке
+        рецептов и при изменении популярности. Аннотации, как и в count,
+        не считаются.
+        """
+        queryset = self.order_by().select_related(None)
+        queryset.query.annotations.clear()
+        queryset.query.set_annotation_mask(None)
+        return queryset.aggregate(
+            count=Count('id'),
+            updated_at=Max('updated_at'),
+            favorites=Sum('favorites_count')
+        )
+
+
 class Recipe(models.Model):
     """Модель рецепта"""
     author = models.ForeignKey(
@@ -63,6 +154,11 @@ class Recipe(models.Model):
         upload_to='recipes/images/',
         verbose_name='Изображение'
     )
+    image_processed = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Уменьшенные копии готовы'
+    )
     tags = models.ManyToManyField(
         Tag,
         related_name='recipes',
@@ -97,12 +193,44 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Дата публикации'
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Дата изменения'
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В избранном'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='В списках покупок'
+    )
+    search_document = models.TextField(
+        blank=True,
+        default='',
+        editable=False,
+        verbose_name='Документ для поиска'
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     def __str__(self):
         return f'{self.name}'
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['pub_date', 'id'],
+                name='recipe_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['favorites_count', 'pub_date'],
+                name='recipe_popular_idx'
+            ),
+        ]
 
 
 class Favorite(models.Model):
@@ -189,3 +317,69 @@ class ShoppingCart(models.Model):
                 name='unique_shopping_cart'
             )
         ]
+
+
+class CartIngredient(models.Model):
+    """Сумма ингредиента по всем рецептам в корзине пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='cart_ingredients',
+        verbose_name='Ингредиент'
+    )
+    amount = models.IntegerField(
+        verbose_name='Количество'
+    )
+
+    def __str__(self):
+        return f'{self.ingredient} в корзине {self.user}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_cart_ingredient'
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя"""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Пользователь'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата публикации'
+    )
+
+    def __str__(self):
+        return f'{self.recipe} в ленте {self.user}'
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique_feed_entry'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'recipe'],
+                name='feed_entry_user_pub_date_idx'
+            ),
+        ]
@@ -0,0 +1,147 @@
+import re
+import threading
+from contextlib import contextmanager
+
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection, transaction
+from django.db.models import FloatField
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+FTS_TABLE = 'recipes_recipe_fts'
+FTS_WEIGHTS = (10.0, 1.0, 5.0)
+
+
+def build_search_documents(recipes, recipe_ingredients):
+    """Документы для поиска: {id: (название, описание, ингредиенты)}"""
+    documents = {
+        pk: (name, text, [])
+        for pk, name, text in recipes.values_list('id', 'name', 'text')
+    }
+    ingredients = recipe_ingredients.filter(
+        recipe__in=list(documents)
+    ).values_list('recipe_id', 'ingredient__name')
+    for recipe_id, name in ingredients:
+        documents[recipe_id][2].append(name)
+    return {
+        pk: (name, text, ' '.join(names))
+        for pk, (name, text, names) in documents.items()
+    }
+
+
+def join_document(document):
+    return '\n'.join(document)
+
+
+def write_search_documents(recipe_model, documents):
+    """Сохраняет документы в поле search_document и индекс FTS5 SQLite"""
+    for pk, document in documents.items():
+        recipe_model.objects.filter(pk=pk).update(
+            search_document=join_document(document)
+        )
+    write_fts_rows(documents)
+
+
+def write_fts_rows(documents):
+    """Заменяет строки индекса FTS5 (только для SQLite)"""
+    if connection.vendor != 'sqlite' or not documents:
+        return
+    with transaction.atomic(), connection.cursor() as cursor:
+        delete_fts_rows(cursor, documents)
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, name, text, ingredients) '
+            'VALUES (%s, %s, %s, %s)',
+            [(pk, *document) for pk, document in documents.items()]
+        )
+
+
+def delete_fts_rows(cursor, recipe_ids):
+    cursor.executemany(
+        f'DELETE FROM {FTS_TABLE} WHERE rowid = %s',
+        [(pk,) for pk in recipe_ids]
+    )
+
+
+def update_search_documents(recipe_ids):
+    """Пересчитывает документы только для переданных рецептов"""
+    from .models import Recipe, RecipeIngredient
+    write_search_documents(Recipe, build_search_documents(
+        Recipe.objects.filter(id__in=recipe_ids),
+        RecipeIngredient.objects.all()
+    ))
+
+
+def remove_search_documents(recipe_ids):
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        delete_fts_rows(cursor, recipe_ids)
+
+
+suspended = threading.local()
+
+
+def suspended_recipes():
+    """Рецепты, документы которых сейчас не пересчитываются сигналами"""
+    if not hasattr(suspended, 'recipes'):
+        suspended.recipes = set()
+    return suspended.recipes
+
+
+def search_suspended(recipe_id):
+    recipes = suspended_recipes()
+    return recipe_id in recipes or None in recipes
+
+
+@contextmanager
+def suspend_search_updates(recipe_id=None):
+    """Внутри блока сигналы не пересчитывают документ рецепта по одному
+    разу на изменение: его обновляют один раз после. Без recipe_id -
+    для любого рецепта этого потока, в том числе еще не созданного"""
+    suspended_recipes().add(recipe_id)
+    try:
+        yield
+    finally:
+        suspended_recipes().discard(recipe_id)
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под запрос, по убыванию релевантности"""
+    if connection.vendor == 'postgresql':
+        query = SearchQuery(value, config=SEARCH_CONFIG)
+        vector = (
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector('search_document', weight='B', config=SEARCH_CONFIG)
+        )
+        return queryset.annotate(
+            document=SearchVector('search_document', config=SEARCH_CONFIG)
+        ).filter(
+            document=query
+        ).annotate(
+            rank=SearchRank(vector, query)
+        ).order_by('-rank', '-pub_date')
+    return search_recipes_fts(queryset, value)
+
+
+def search_recipes_fts(queryset, value):
+    """
+    Поиск через FTS5 для SQLite: соединяем рецепты с индексом по rowid,
+    релевантность считаем bm25 с весами колонок
+    """
+    terms = re.findall(r'\w+', value)
+    if not terms:
+        return queryset.none()
+    match = ' '.join(f'"{term}"*' for term in terms)
+    recipe_table = queryset.model._meta.db_table
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = {recipe_table}.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[match]
+    ).annotate(rank=RawSQL(
+        f'-bm25({FTS_TABLE}, %s, %s, %s)', FTS_WEIGHTS,
+        output_field=FloatField()
+    )).order_by('-rank', '-pub_date')
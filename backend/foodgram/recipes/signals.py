@@ -0,0 +1,148 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from users.models import Follow, User
+
+from .cart import remove_recipe_from_carts
+from .catalog import (bump_catalog_version, bump_user_lists_version,
+                      touch_recipes)
+from .feed import clear_timeline, fan_out, fill_timeline
+from .models import (CartIngredient, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredient, ShoppingCart, Tag)
+from .search import (remove_search_documents, search_suspended,
+                     suspended_recipes, update_search_documents)
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_document(sender, instance, **kwargs):
+    if not search_suspended(instance.id):
+        update_search_documents([instance.id])
+
+
+@receiver(pre_delete, sender=Recipe)
+def suspend_recipe_search_document(sender, instance, **kwargs):
+    suspended_recipes().add(instance.id)
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_search_document(sender, instance, **kwargs):
+    suspended_recipes().discard(instance.id)
+    remove_search_documents([instance.id])
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_carts(sender, instance, **kwargs):
+    remove_recipe_from_carts(
+        CartIngredient, ShoppingCart, RecipeIngredient, instance.id
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def update_ingredients_search_document(sender, instance, **kwargs):
+    if not search_suspended(instance.recipe_id):
+        update_search_documents([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_recipes_search_documents(sender, instance, created,
+                                               **kwargs):
+    if not created:
+        update_search_documents(
+            instance.recipe_ingredient.values('recipe_id')
+        )
+
+
+@receiver(post_save, sender=Recipe)
+def fan_out_recipe(sender, instance, created, **kwargs):
+    if created:
+        fan_out(FeedEntry, Follow, instance)
+
+
+@receiver(post_save, sender=Follow)
+def fill_follower_timeline(sender, instance, created, **kwargs):
+    if created:
+        fill_timeline(FeedEntry, Recipe, instance)
+
+
+@receiver(post_delete, sender=Follow)
+def clear_follower_timeline(sender, instance, **kwargs):
+    clear_timeline(FeedEntry, instance)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def change_catalog_version(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=User)
+def change_catalog_version_for_author(sender, instance, created,
+                                      update_fields=None, **kwargs):
+    """
+    Регистрация, вход и смена пароля не меняют выдачу: в ней только
+    имя, фамилия, username и email автора
+    """
+    if not created and instance.public_fields_changed(update_fields):
+        bump_catalog_version()
+
+
+@receiver(post_delete, sender=User)
+def change_catalog_version_for_deleted_author(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def touch_ingredients_recipe(sender, instance, **kwargs):
+    if not search_suspended(instance.recipe_id):
+        touch_recipes(Recipe.objects.filter(id=instance.recipe_id))
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def touch_tagged_recipes(sender, instance, action, reverse, pk_set,
+                         **kwargs):
+    if not reverse and action in ('post_add', 'post_remove', 'post_clear'):
+        touch_recipes(Recipe.objects.filter(id=instance.id))
+    elif reverse and action in ('post_add', 'post_remove'):
+        touch_recipes(Recipe.objects.filter(id__in=pk_set))
+    elif reverse and action == 'pre_clear':
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Tag)
+def touch_tag_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(pre_delete, sender=Tag)
+def touch_deleted_tag_recipes(sender, instance, **kwargs):
+    touch_recipes(Recipe.objects.filter(tags=instance))
+
+
+@receiver(post_save, sender=Ingredient)
+def touch_ingredient_recipes(sender, instance, created, **kwargs):
+    if not created:
+        touch_recipes(
+            Recipe.objects.filter(recipe_ingredient__ingredient=instance)
+        )
+
+
+@receiver(post_save, sender=User)
+def touch_author_recipes(sender, instance, created, update_fields=None,
+                         **kwargs):
+    if not created and instance.public_fields_changed(update_fields):
+        touch_recipes(Recipe.objects.filter(author=instance))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def change_follower_lists_version(sender, instance, **kwargs):
+    bump_user_lists_version(instance.user_id)
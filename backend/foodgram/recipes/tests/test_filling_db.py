@@ -0,0 +1,65 @@
+import io
+import json
+import os
+import tempfile
+from contextlib import redirect_stdout
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from recipes.models import Ingredient
+
+INGREDIENTS = [
+    ('абрикосы', 'г'),
+    ('баклажаны', 'шт.'),
+    ('ванилин', 'г'),
+    ('горох', 'г'),
+    ('дрожжи', 'г'),
+]
+
+
+class FillingDbTest(TestCase):
+    """Загрузка ингредиентов частями из csv и json"""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def load(self, path):
+        with redirect_stdout(io.StringIO()):
+            call_command('filling_db', path, chunk_size=2)
+
+    def stored(self):
+        return sorted(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+
+    def test_csv_import_is_idempotent(self):
+        path = self.write('ingredients.csv', ''.join(
+            f'{name},{unit}\n' for name, unit in INGREDIENTS
+        ))
+        self.load(path)
+        self.load(path)
+        self.assertEqual(self.stored(), INGREDIENTS)
+
+    def test_json_import_is_idempotent(self):
+        path = self.write('ingredients.json', json.dumps([
+            {'name': name, 'measurement_unit': unit}
+            for name, unit in INGREDIENTS
+        ], ensure_ascii=False))
+        self.load(path)
+        self.load(path)
+        self.assertEqual(self.stored(), INGREDIENTS)
+
+    def test_short_csv_row(self):
+        path = self.write(
+            'ingredients.csv', 'абрикосы,г\nбаклажаны,шт.\n\nванилин\n'
+        )
+        with self.assertRaisesMessage(CommandError, 'Строка 4'):
+            self.load(path)
+        self.assertFalse(Ingredient.objects.exists())
@@ -0,0 +1,115 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from api.metrics import record_cache
+from django.conf import settings
+from recipes.catalog import current_version, shared_cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+VERSION_CACHE_KEY = 'auth_token_version'
+
+
+def entry_key(key):
+    return f'auth_token:{key}'
+
+
+class TokenCache:
+    """
+    Кэш токен -> (пользователь, токен) для TokenAuthentication:
+    LRU в памяти процесса поверх общего кэша TOKEN_CACHE_ALIAS.
+    При инвалидации меняется версия в общем кэше, поэтому записи
+    в памяти других процессов тоже перестают использоваться. Если
+    общего кэша нет (LocMem, Dummy), кэш выключен: отзыв токена
+    в одном процессе не дошел бы до остальных.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = OrderedDict()
+
+    @property
+    def shared(self):
+        return shared_cache(settings.TOKEN_CACHE_ALIAS)
+
+    def version(self):
+        """
+        Версия из общего кэша. Пропавшая версия заменяется новой:
+        если бы она читалась как None, записи, сохраненные до ее
+        появления, снова стали бы действительными после отзыва токенов.
+        """
+        if self.shared is None:
+            return None
+        return current_version(self.shared, VERSION_CACHE_KEY)
+
+    def get(self, key, version):
+        """Копия закэшированной пары: запросы не делят один объект User"""
+        if self.shared is None or version is None:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                value, entry_version, expires_at = entry
+                if entry_version == version and expires_at > time.monotonic():
+                    self.entries.move_to_end(key)
+                    return copy.deepcopy(value)
+                del self.entries[key]
+        value = self.shared.get(entry_key(key))
+        if value is not None:
+            self.remember(key, value, version)
+        return copy.deepcopy(value)
+
+    def set(self, key, value, version):
+        if (
+            self.shared is None or version is None
+            or self.version() != version
+        ):
+            return
+        self.shared.set(entry_key(key), value, settings.TOKEN_CACHE_TTL)
+        self.remember(key, value, version)
+
+    def remember(self, key, value, version):
+        with self.lock:
+            self.entries[key] = (
+                value, version, time.monotonic() + settings.TOKEN_CACHE_TTL
+            )
+            self.entries.move_to_end(key)
+            while len(self.entries) > settings.TOKEN_CACHE_SIZE:
+                self.entries.popitem(last=False)
+
+    def invalidate(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+        if self.shared is not None:
+            self.shared.delete_many([entry_key(key) for key in keys])
+            self.shared.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+
+token_cache = TokenCache()
+
+
+def invalidate_user_tokens(user_id):
+    """Сбрасывает кэш всех токенов пользователя"""
+    keys = list(
+        Token.objects.filter(user_id=user_id).values_list('key', flat=True)
+    )
+    if keys:
+        token_cache.invalidate(keys)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к базе для известных токенов"""
+
+    def authenticate_credentials(self, key):
+        version = token_cache.version()
+        cached = token_cache.get(key, version)
+        record_cache('auth_token', hit=cached is not None)
+        if cached is not None:
+            return cached
+        user, token = super().authenticate_credentials(key)
+        token_cache.set(key, (user, token), version)
+        return user, token
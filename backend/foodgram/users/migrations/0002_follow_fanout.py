@@ -0,0 +1,18 @@
+# Generated by Django 2.2.20 on 2026-10-18 04:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='follow',
+            name='fanout',
+            field=models.BooleanField(default=True, editable=False, verbose_name='Рецепты автора раскладываются в ленту'),
+        ),
+    ]
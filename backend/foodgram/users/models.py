@@ -1,6 +1,8 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+PUBLIC_FIELDS = ('username', 'email', 'first_name', 'last_name')
+
 
 class User(AbstractUser):
     """Модель пользователя"""
@@ -34,6 +36,36 @@ class User(AbstractUser):
     def __str__(self):
         return f'{self.first_name} {self.last_name}'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        user = super().from_db(db, field_names, values)
+        user.saved_public_fields = user.public_fields()
+        return user
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self.saved_public_fields = self.public_fields()
+
+    def public_fields(self):
+        """Поля автора из выдачи рецептов или None, если часть отложена"""
+        if any(name not in self.__dict__ for name in PUBLIC_FIELDS):
+            return None
+        return {name: self.__dict__[name] for name in PUBLIC_FIELDS}
+
+    def public_fields_changed(self, update_fields=None):
+        """
+        Изменились ли при сохранении поля из выдачи рецептов. Если
+        загруженных значений нет, считаем, что изменились.
+        """
+        if update_fields and not set(update_fields) & set(PUBLIC_FIELDS):
+            return False
+        saved = getattr(self, 'saved_public_fields', None)
+        if saved is None:
+            return True
+        return any(
+            getattr(self, name) != value for name, value in saved.items()
+        )
+
     class Meta:
         ordering = ['username']
 
@@ -52,6 +84,11 @@ class Follow(models.Model):
         verbose_name='Автор',
         on_delete=models.CASCADE,
     )
+    fanout = models.BooleanField(
+        default=True,
+        editable=False,
+        verbose_name='Рецепты автора раскладываются в ленту'
+    )
 
     def __str__(self):
         return f'{self.user} - {self.following}'
@@ -1,3 +1,5 @@
+from api.sparse_fields import SparseFieldsMixin
+from django.conf import settings
 from recipes.models import Recipe
 from rest_framework import serializers
 
@@ -27,7 +29,7 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 
-class AuthorSerializer(UserSerializer):
+class AuthorSerializer(SparseFieldsMixin, UserSerializer):
     """Сериализатор для автора рецепта"""
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_is_subscribed'
@@ -45,9 +47,12 @@ class AuthorSerializer(UserSerializer):
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         if (
             self.context.get('request') is not None
             and self.context.get('request').user.is_authenticated
+            and self.context.get('request').user != obj
         ):
             return Follow.objects.filter(
                 user=self.context.get('request').user,
@@ -56,7 +61,7 @@ class AuthorSerializer(UserSerializer):
         return False
 
 
-class FollowSerializer(serializers.ModelSerializer):
+class FollowSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Сериализатор для подписки на автора"""
     email = serializers.ReadOnlyField(source='following.id')
     id = serializers.ReadOnlyField(source='following.id')
@@ -68,26 +73,23 @@ class FollowSerializer(serializers.ModelSerializer):
     recipes_count = serializers.SerializerMethodField()
 
     def get_is_subscribed(self, obj):
-        return Follow.objects.filter(
-            user=obj.user,
-            following=obj.following
-        ).exists()
+        return True
 
     def get_recipes(self, obj):
         from api.serializers import CartSerializer
-        if self.context:
-            recipes_limit = self.context['request'].GET.get('recipes_limit')
-            if recipes_limit:
-                queryset = Recipe.objects.filter(
-                    author=obj.following
-                )[:int(recipes_limit)]
-        else:
-            queryset = Recipe.objects.filter(
-                author=obj.following
-            )
+        if hasattr(obj.following, 'recipes_preview'):
+            return CartSerializer(
+                obj.following.recipes_preview,
+                many=True
+            ).data
+        queryset = Recipe.objects.filter(author=obj.following)[
+            :get_recipes_limit(self.context.get('request'))
+        ]
         return CartSerializer(queryset, many=True).data
 
     def get_recipes_count(self, obj):
+        if hasattr(obj, 'recipes_count'):
+            return obj.recipes_count
         return Recipe.objects.filter(author=obj.following).count()
 
     class Meta:
@@ -101,6 +103,22 @@ class FollowSerializer(serializers.ModelSerializer):
         ]
 
 
+def get_recipes_limit(request):
+    """
+    Значение параметра recipes_limit. Без него отдаются последние
+    SUBSCRIPTION_RECIPES_LIMIT рецептов, а не все: у плодовитого автора
+    десятки тысяч рецептов, и ответ о подписке весил бы мегабайты.
+    """
+    limit = settings.SUBSCRIPTION_RECIPES_LIMIT
+    if request is None:
+        return limit
+    try:
+        requested = int(request.query_params.get('recipes_limit'))
+    except (TypeError, ValueError):
+        return limit
+    return requested if requested > 0 else limit
+
+
 class PasswordSerializer(serializers.ModelSerializer):
     """Сериализатор смены пароля от учетной записи"""
     new_password = serializers.CharField(
@@ -0,0 +1,19 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import invalidate_user_tokens, token_cache
+from .models import User
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    token_cache.invalidate([instance.key])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens_on_save(sender, instance, update_fields, **kwargs):
+    """Смена пароля, деактивация и любые правки пользователя"""
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    invalidate_user_tokens(instance.id)
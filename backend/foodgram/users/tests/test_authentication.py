@@ -0,0 +1,64 @@
+import shutil
+import tempfile
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from users.authentication import (VERSION_CACHE_KEY, CachedTokenAuthentication,
+                                  token_cache)
+from users.models import User
+
+
+class TokenCacheTest(TestCase):
+    """Отозванный токен не оживает после потери версии в общем кэше"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = override_settings(CACHES={
+            'default': {
+                'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            },
+            'shared': {
+                'BACKEND':
+                    'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': directory,
+            },
+        }, TOKEN_CACHE_ALIAS='shared')
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.addCleanup(token_cache.entries.clear)
+        self.user = User.objects.create_user(
+            username='user', email='user@example.com', password='password'
+        )
+        self.key = Token.objects.create(user=self.user).key
+        self.authentication = CachedTokenAuthentication()
+
+    def authenticate(self):
+        return self.authentication.authenticate_credentials(self.key)
+
+    def test_cached_user_is_a_copy(self):
+        first, _ = self.authenticate()
+        second, _ = self.authenticate()
+        self.assertEqual(first, second)
+        self.assertIsNot(first, second)
+
+    def test_revoked_after_version_eviction(self):
+        self.authenticate()
+        other_worker_entries = dict(token_cache.entries)
+        self.user.is_active = False
+        self.user.save()
+        token_cache.entries.update(other_worker_entries)
+        caches['shared'].delete(VERSION_CACHE_KEY)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_deleted_token_after_cache_restart(self):
+        self.authenticate()
+        other_worker_entries = dict(token_cache.entries)
+        Token.objects.get(key=self.key).delete()
+        token_cache.entries.update(other_worker_entries)
+        caches['shared'].clear()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
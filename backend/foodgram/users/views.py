@@ -1,7 +1,13 @@
 from api.pagination import PageLimitPagination
+from api.row_serializers import USER
+from api.sparse_fields import requested_fields
+from django.db.models import (Count, F, Prefetch, Window,
+                              prefetch_related_objects)
+from django.db.models.functions import RowNumber
 from django.shortcuts import get_object_or_404
 from djoser import utils, views
 from djoser.conf import settings
+from recipes.models import Recipe
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import AllowAny, IsAuthenticated
@@ -9,7 +15,8 @@ from rest_framework.response import Response
 
 from .models import Follow, User
 from .serializers import (AuthorSerializer, FollowSerializer,
-                          PasswordSerializer, UserSerializer)
+                          PasswordSerializer, UserSerializer,
+                          get_recipes_limit)
 
 
 class CreateViewSet(
@@ -32,12 +39,18 @@ class UserViewSet(CreateViewSet):
             return AuthorSerializer
         return UserSerializer
 
+    def list(self, request, *args, **kwargs):
+        page = self.paginate_queryset(USER.rows(self.get_queryset()))
+        return self.get_paginated_response([USER(row) for row in page])
+
     @action(
         detail=False,
         permission_classes=(IsAuthenticated,)
     )
     def me(self, request):
-        serializer = AuthorSerializer(request.user)
+        serializer = AuthorSerializer(
+            request.user, context={'request': request}
+        )
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(
@@ -60,11 +73,29 @@ class UserViewSet(CreateViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def subscriptions(self, request):
+        fields = requested_fields(request, FollowSerializer().fields)
         queryset = Follow.objects.filter(
             user=request.user
         ).select_related('following')
+        if fields is None or 'recipes_count' in fields:
+            queryset = queryset.annotate(
+                recipes_count=Count('following__recipes')
+            )
+        page = self.paginate_queryset(queryset)
+        if fields is None or 'recipes' in fields:
+            recipes = top_recipes_per_author(
+                Recipe.objects.filter(author_id__in=[
+                    subscription.following_id for subscription in page
+                ]),
+                get_recipes_limit(request)
+            )
+            prefetch_related_objects(page, Prefetch(
+                'following__recipes',
+                queryset=recipes,
+                to_attr='recipes_preview'
+            ))
         serializer = FollowSerializer(
-            self.paginate_queryset(queryset),
+            page,
             many=True,
             context={'request': request}
         )
@@ -91,7 +122,9 @@ class UserViewSet(CreateViewSet):
                     {'errors': 'Вы уже подписаны'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
-            serializer = FollowSerializer(subscription)
+            serializer = FollowSerializer(
+                subscription, context={'request': request}
+            )
             return Response(
                 serializer.data,
                 status=status.HTTP_201_CREATED
@@ -108,6 +141,26 @@ class UserViewSet(CreateViewSet):
         )
 
 
+def top_recipes_per_author(recipes, limit):
+    """
+    Первые limit рецептов каждого автора из recipes
+    через ROW_NUMBER() OVER (PARTITION BY author_id)
+    """
+    ranked = recipes.annotate(recipe_rank=Window(
+        expression=RowNumber(),
+        partition_by=[F('author_id')],
+        order_by=[F('pub_date').desc(), F('id').desc()]
+    )).order_by().values('id', 'recipe_rank')
+    sql, params = ranked.query.sql_with_params()
+    return Recipe.objects.extra(
+        where=[
+            f'{Recipe._meta.db_table}.id IN '
+            f'(SELECT id FROM ({sql}) ranked WHERE recipe_rank <= %s)'
+        ],
+        params=[*params, limit]
+    )
+
+
 class TokenCreateView(views.TokenCreateView):
     """Вьюсет для генерации Токена"""
     def _action(self, serializer):